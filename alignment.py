@@ -1,3 +1,26 @@
+import time
+from array import array
+
+# Below this many cells linear_space_path() just fills the matrix and runs find_path()
+LINEAR_SPACE_BASE_CELLS = 1 << 16
+
+ENGINES = ('matrix', 'linear', 'numpy', 'seed', 'tiled', 'auto')
+
+# engine='auto' plans within this many bytes of DP storage unless given a memory_budget
+AUTO_MEMORY_BUDGET = 1 << 30
+
+# banded_width='auto' starts with this many diagonals of padding and doubles it until the result is proven optimal
+AUTO_BAND_START = 8
+
+# With max_cost, every this many rows the fill checks whether any cell can still finish within the threshold
+ABANDON_CHECK_ROWS = 16
+
+# Traceback moves, numbered in find_path()'s tie-break order: diagonal, then left, then up
+DIAG = 0
+LEFT = 1
+UP = 2
+
+
 def align(
         seq1: str,
         seq2: str,
@@ -5,8 +28,17 @@ def align(
         indel_penalty=5,
         sub_penalty=1,
         banded_width=-1,
-        gap='-'
-) -> tuple[float, str | None, str | None]:
+        gap='-',
+        traceback=True,
+        engine='matrix',
+        costs=None,
+        seed_kmer=None,
+        workers=None,
+        compact=False,
+        max_cost=None,
+        stats=None,
+        memory_budget=None
+) -> 'tuple[float, str | None, str | None] | Alignment':
     """
         Align seq1 against seq2 using Needleman-Wunsch
         Put seq1 on left (j) and seq2 on top (i)
@@ -16,8 +48,29 @@ def align(
         :param match_award: how many points to award a match
         :param indel_penalty: how many points to award a gap in either sequence
         :param sub_penalty: how many points to award a substitution
-        :param banded_width: banded_width * 2 + 1 is the width of the banded alignment; -1 indicates full alignment
+        :param banded_width: banded_width * 2 + 1 is the width of the banded alignment; -1 indicates full alignment;
+            'auto' widens a band until its result is provably the same as the full alignment's
         :param gap: the character to use to represent gaps in the alignment strings
+        :param traceback: False skips the traceback and keeps only two DP rows; both alignments come back as None
+        :param engine: 'matrix' fills the whole matrix then traces back; 'linear' uses linear-space divide and
+            conquer (full alignment only), which is slower but fits genome-length pairs in memory;
+            'numpy' fills anti-diagonals with NumPy (full alignment only, needs numpy installed);
+            'seed' anchors on shared unique k-mers and only aligns between them (fast, but not guaranteed optimal);
+            'tiled' fills tiles of the matrix in parallel worker processes (full alignment only);
+            'auto' lets plan_alignment() choose from the lengths, banded_width and memory_budget
+        :param costs: a CostTable of substitution costs to use instead of match_award and sub_penalty
+        :param seed_kmer: anchor length for engine='seed'; defaults to seeds.SEED_KMER
+        :param workers: number of worker processes for engine='tiled'; defaults to one per CPU
+        :param compact: return an Alignment, which keeps a run-length edit script and renders the strings on demand;
+            it unpacks like the usual tuple
+        :param max_cost: give up as soon as the alignment provably costs more than this; the result is then
+            (None, None, None). Only for engine='matrix'; the threshold sets the band itself, so it needs no
+            banded_width, but a numeric one still applies
+        :param stats: a dict to fill with where the time went: engine, total_seconds, path_length and,
+            for engine='matrix', fill_seconds, traceback_seconds, cells (DP cells computed), sentinel_reads
+            (reads of neighbours outside the band) and matrix_bytes (the largest DP storage held at once);
+            with engine='auto', also the plan that was followed
+        :param memory_budget: bytes of DP storage engine='auto' may plan for; defaults to AUTO_MEMORY_BUDGET
         :return: alignment cost, alignment 1, alignment 2
     """
 
@@ -25,62 +78,558 @@ def align(
     penalties = {
         'match': match_award,
         'indel': indel_penalty,
-        'sub': sub_penalty
+        'sub': sub_penalty,
+        'costs': costs
     }
 
-    if banded_width == -1:
-        matrix = edit(penalties, seq1, seq2)
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, not {engine!r}")
+    if engine not in ('matrix', 'seed', 'auto') and banded_width != -1:
+        raise ValueError(f"engine={engine!r} only does full alignment; use engine='matrix' with banded_width")
+    if engine != 'matrix' and max_cost is not None:
+        raise ValueError(f"engine={engine!r} does not support max_cost; use engine='matrix'")
+    if engine != 'auto' and memory_budget is not None:
+        raise ValueError("memory_budget is only for engine='auto'")
+
+    # engine='seed' bands each piece between anchors, falling back to a full fill where a piece can't reach
+    if engine != 'seed' and banded_width not in (-1, 'auto') and abs(len(seq1) - len(seq2)) > banded_width:
+        raise ValueError(
+            f"banded_width={banded_width} cannot reach the end cell: "
+            f"the sequences differ in length by {abs(len(seq1) - len(seq2))}"
+        )
+
+    plan = None
+    if engine == 'auto':
+        plan = plan_alignment(
+            len(seq1), len(seq2), banded_width, traceback,
+            AUTO_MEMORY_BUDGET if memory_budget is None else memory_budget, _typecode(penalties)
+        )
+        engine = 'linear' if plan['strategy'] == 'linear' else 'matrix'
+        banded_width = plan['banded_width']
+
+    if stats is None:
+        return _align(
+            penalties, seq1, seq2, banded_width, gap, traceback, engine, seed_kmer, workers, compact, max_cost,
+            plan=plan
+        )
+
+    stats.clear()
+    stats.update(
+        engine=engine, fill_seconds=None, traceback_seconds=None, cells=None, sentinel_reads=None, matrix_bytes=None
+    )
+    started = time.perf_counter()
+    result = _align(
+        penalties, seq1, seq2, banded_width, gap, traceback, engine, seed_kmer, workers, compact, max_cost, stats, plan
+    )
+    stats['total_seconds'] = time.perf_counter() - started
+    if plan is not None:
+        stats['plan'] = plan
+    if isinstance(result, Alignment):
+        stats['path_length'] = len(result)
+    else:
+        stats['path_length'] = None if result[1] is None else len(result[1])
+    return result
+
+
+def _align(penalties: dict, seq1: str, seq2: str, banded_width, gap: str, traceback: bool, engine: str, seed_kmer,
+           workers, compact: bool, max_cost, stats: dict | None = None, plan: dict | None = None):
+    """
+    align() after its arguments are checked: pick the engine and run it, recording phases into stats if given.
+    With a plan from plan_alignment(), banded_width='auto' stays within its budget or falls back to linear space.
+    """
+    if compact and traceback and engine != 'matrix':
+        # The other engines build the gapped strings themselves; compress what they return
+        return Alignment.from_strings(*_align(
+            penalties, seq1, seq2, banded_width, gap, traceback, engine, seed_kmer, workers, False, max_cost
+        ), gap)
+
+    if engine == 'seed':
+        from seeds import SEED_KMER, seed_align
+        cost, alignment1, alignment2 = seed_align(penalties, gap, seq1, seq2, banded_width, seed_kmer or SEED_KMER)
+        if not traceback:
+            return cost, None, None
+        return cost, alignment1, alignment2
+
+    if engine == 'numpy':
+        from wavefront import wavefront_path, wavefront_score
+        if not traceback:
+            return wavefront_score(penalties, seq1, seq2), None, None
+        return wavefront_path(penalties, gap, seq1, seq2)
+
+    if engine == 'tiled':
+        from tiled import tiled_path, tiled_score
+        if not traceback:
+            return tiled_score(penalties, seq1, seq2, workers), None, None
+        return tiled_path(penalties, gap, seq1, seq2, workers)
+
+    if engine == 'linear' and traceback:
+        return linear_space_path(penalties, gap, seq1, seq2)
+
+    # Everything below fills a matrix, band or pair of rows, then traces back through it
+    n = len(seq1)
+    m = len(seq2)
+    itemsize = array(_typecode(penalties)).itemsize
+    fill_started = time.perf_counter()
+
+    if max_cost is not None:
+        result = capped_edit(penalties, seq1, seq2, max_cost, banded_width, traceback, stats)
+    elif not traceback:
+        if banded_width == -1:
+            result = edit_score(penalties, seq1, seq2)
+            _count_fill(stats, n, m, -n, m, 2 * (min(n, m) + 1) * itemsize)
+        elif banded_width == 'auto':
+            result = auto_band_edit(penalties, seq1, seq2, traceback=False, stats=stats)
+        else:
+            result = banded_edit_score(penalties, seq1, seq2, banded_width)
+            _count_fill(stats, n, m, -banded_width, banded_width, 2 * (2 * banded_width + 3) * itemsize)
+    elif banded_width == -1:
+        result = edit(penalties, seq1, seq2)
+        _count_fill(stats, n, m, -n, m, result.nbytes)
+    elif banded_width == 'auto':
+        result = auto_band_edit(penalties, seq1, seq2, stats=stats, max_bytes=plan and plan['budget'])
+        if result is None:
+            if _linear_bytes(n, m, _typecode(penalties)) > plan['budget']:
+                raise MemoryError(f"neither banded_width='auto' nor linear space fits {plan['budget']} bytes")
+            plan['fallback'] = 'linear'
+            return _align(penalties, seq1, seq2, -1, gap, traceback, 'linear', seed_kmer, workers, compact, None, stats)
+    else:
+        result = banded_edit(penalties, seq1, seq2, banded_width)
+        _count_fill(stats, n, m, result.lo, result.hi, result.nbytes)
+
+    if stats is not None:
+        stats['fill_seconds'] = time.perf_counter() - fill_started
+    if result is None:
+        # Only capped_edit() gives up
+        return None, None, None
+    if not traceback:
+        return result, None, None
+
+    traceback_started = time.perf_counter()
+    if compact:
+        path = find_alignment(penalties, gap, result, seq1, seq2)
     else:
-        matrix = banded_edit(penalties, seq1, seq2, banded_width)
+        path = find_path(penalties, gap, result, seq1, seq2)
+    if stats is not None:
+        stats['traceback_seconds'] = time.perf_counter() - traceback_started
 
-    path_tuple = find_path(penalties, gap, matrix, seq1, seq2)
+    return path
 
-    return path_tuple
 
+def reaching_band(banded_width, seq1: str, seq2: str):
+    """
+    banded_width widened, if it is a number, to the length difference of seq1 and seq2,
+    the narrowest band that still reaches the end cell; -1 and 'auto' are returned as they are
+    """
+    if banded_width in (-1, 'auto'):
+        return banded_width
+    return max(banded_width, abs(len(seq1) - len(seq2)))
 
 
-def edit(penalties: dict, x: str, y: str) -> dict:
-    matrix = {}
-    
-    for i in range(len(x) + 1):
-        matrix[(i, 0)] = i * penalties["indel"]
+def plan_alignment(n: int, m: int, banded_width=-1, traceback: bool = True,
+                   memory_budget: int = AUTO_MEMORY_BUDGET, typecode: str = 'i') -> dict:
+    """
+    engine='auto': choose the cheapest way to align lengths n and m whose DP storage fits memory_budget.
+    - no traceback: two rows ('score-only'), over the requested band if any
+    - a numeric banded_width: that band ('band'), as only a band gives the banded answer
+    - full alignment: the whole matrix ('matrix') if it fits; otherwise 'auto-band', the provably optimal
+      banded_width='auto', which falls back to 'linear' (linear space) if its band outgrows the budget
+    - banded_width='auto': 'auto-band' straight away, with the same fallback
+    :return: the strategy, the banded_width to run it with, the estimated cells and bytes, the budget and why
+    :raise MemoryError: if a requested band, or linear space, does not fit
+    """
+    full_cells = (n + 1) * (m + 1)
+    full_bytes = _matrix_bytes(n + 1, m + 1, typecode)
+    itemsize = array(typecode).itemsize
+    decision = {'budget': memory_budget, 'fallback': None}
+
+    if not traceback:
+        if banded_width in (-1, 'auto'):
+            cells = full_cells
+            width = min(n, m) + 1
+        else:
+            cells = (n + 1) * (2 * banded_width + 1)
+            width = 2 * banded_width + 3
+        return {**decision, 'strategy': 'score-only', 'banded_width': banded_width, 'cells': cells,
+                'bytes': 2 * width * itemsize, 'reason': 'no traceback needs only two rows'}
+
+    if banded_width not in (-1, 'auto'):
+        band_bytes = _band_bytes(n + 1, -banded_width, banded_width, typecode)
+        if band_bytes > memory_budget:
+            raise MemoryError(
+                f"banded_width={banded_width} needs about {band_bytes} bytes, over the {memory_budget} byte budget"
+            )
+        return {**decision, 'strategy': 'band', 'banded_width': banded_width,
+                'cells': (n + 1) * (2 * banded_width + 1), 'bytes': band_bytes, 'reason': 'the requested band fits'}
+
+    if banded_width == -1 and full_bytes <= memory_budget:
+        return {**decision, 'strategy': 'matrix', 'banded_width': -1, 'cells': full_cells, 'bytes': full_bytes,
+                'reason': 'the full matrix fits'}
+
+    band_bytes = _band_bytes(n + 1, min(0, m - n) - AUTO_BAND_START, max(0, m - n) + AUTO_BAND_START, typecode)
+    if band_bytes <= memory_budget:
+        return {**decision, 'strategy': 'auto-band', 'banded_width': 'auto', 'cells': full_cells,
+                'bytes': band_bytes,
+                'reason': 'banded_width=auto was asked for' if banded_width == 'auto' else 'the full matrix does not fit'}
+
+    linear_bytes = _linear_bytes(n, m, typecode)
+    if linear_bytes > memory_budget:
+        raise MemoryError(f'even linear space needs about {linear_bytes} bytes, over the {memory_budget} byte budget')
+    return {**decision, 'strategy': 'linear', 'banded_width': -1, 'cells': full_cells, 'bytes': linear_bytes,
+            'reason': 'not even the narrowest automatic band fits'}
+
+
+def edit(penalties: dict, x: str, y: str) -> 'Matrix':
+    matrix = Matrix(len(x) + 1, len(y) + 1, _typecode(penalties))
+
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+
+    top = matrix.row(0)
     for j in range(len(y) + 1):
-        matrix[(0, j)] = j * penalties["indel"]
-    
+        top[j] = j * indel
+
+    codes = bytearray(len(y) + 1)
+    codes[0] = UP
+
+    prev = top
     for i in range(1, len(x) + 1):
-        for j in range(1, len(y) + 1):
+        row = matrix.row(i)
+        row[0] = i * indel
+        _edit_row_moves(prev, row, codes, profiles[x_codes[i - 1]], indel)
+        matrix.moves.set_row(i, codes)
+        prev = row
 
-            matrix[(i, j)] = min(
-                diff(penalties, x[i - 1], y[j - 1]) + matrix[(i - 1, j - 1)],
-                penalties["indel"] + matrix[(i, j - 1)],
-                penalties["indel"] + matrix[(i - 1, j)]
-            )
+    return matrix
+
+def banded_edit(penalties: dict, x: str, y: str, banded_width: int) -> 'BandMatrix':
+    return diagonal_band_edit(penalties, x, y, -banded_width, banded_width)
 
+def diagonal_band_edit(penalties: dict, x: str, y: str, lo: int, hi: int) -> 'BandMatrix':
+    """
+    banded_edit() over the diagonals lo <= j - i <= hi, which must include 0
+    """
+    matrix = BandMatrix(len(x) + 1, len(y) + 1, lo, hi, _typecode(penalties))
+    for _ in _band_edit_rows(penalties, x, y, matrix):
+        pass
     return matrix
 
-def banded_edit(penalties: dict, x: str, y: str, banded_width: int) -> dict:
-    matrix = {}
-        
-    for i in range(banded_width + 1):
-        matrix[(i, 0)] = i * penalties["indel"]
-    for j in range(banded_width + 1):
-        matrix[(0, j)] = j * penalties["indel"]
-    
+def _band_edit_rows(penalties: dict, x: str, y: str, matrix: 'BandMatrix'):
+    """
+    Fill matrix row by row, yielding (i, row, base) after each row (row 0 included), where row[base + j] is (i, j)
+    """
+    lo = matrix.lo
+    hi = matrix.hi
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+
+    for i in range(min(-lo, len(x)) + 1):
+        matrix[i, 0] = i * indel
+    for j in range(min(hi, len(y)) + 1):
+        matrix[0, j] = j * indel
+
+    cells = matrix.cells
+    codes = bytearray(matrix.width)
+    yield 0, matrix.row(0), -lo
+
     for i in range(1, len(x) + 1):
+        _band_row_moves(
+            cells, matrix.index(i, 0), cells, matrix.index(i - 1, 0), codes, -lo - i,
+            max(1, i + lo), min(len(y), i + hi),
+            profiles[x_codes[i - 1]], indel
+        )
+        matrix.moves.set_row(i, codes)
+        yield i, matrix.row(i), -i - lo
+
+def edit_score(penalties: dict, x: str, y: str):
+    """
+    Same cost as edit(), keeping only two rows of the shorter sequence
+    """
+    if len(y) > len(x):
+        x, y = y, x
+        penalties = _swapped(penalties)
 
-        for j in range(get_start(i, banded_width), get_end(i, banded_width, len(y)) + 1):
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+    typecode = _typecode(penalties)
 
-            diag = calc_diag(penalties, matrix, x, y, i, j)
-            up = calc_up(penalties, matrix, i, j)
-            left = calc_left(penalties, matrix, i, j)
+    prev = array(typecode, [j * indel for j in range(len(y) + 1)])
+    row = array(typecode, [0]) * (len(y) + 1)
 
-            matrix[(i, j)] = min(
-                diag,
-                up,
-                left
-            )
+    for i in range(1, len(x) + 1):
+        row[0] = i * indel
+        _edit_row(prev, row, profiles[x_codes[i - 1]], indel)
+        prev, row = row, prev
 
-    return matrix
+    return prev[len(y)]
+
+def banded_edit_score(penalties: dict, x: str, y: str, banded_width: int):
+    return diagonal_band_score(penalties, x, y, -banded_width, banded_width)
+
+def diagonal_band_score(penalties: dict, x: str, y: str, lo: int, hi: int):
+    """
+    Same cost as diagonal_band_edit(), keeping only two band rows
+    """
+    for i, row, base in _band_score_rows(penalties, x, y, lo, hi):
+        pass
+    return row[base + len(y)]
+
+def _band_score_rows(penalties: dict, x: str, y: str, lo: int, hi: int):
+    """
+    Fill the band row by row in two rolling buffers, yielding (i, row, base) after each row
+    (row 0 included), where row[base + j] is (i, j). The buffer is reused once the caller moves on.
+    Slot j - i - lo + 1 of a row holds (i, j); the slots at both ends stay sentinels.
+    """
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+    typecode = _typecode(penalties)
+
+    blank = array(typecode, [_sentinel(typecode)]) * (hi - lo + 3)
+    prev = array(typecode, blank)
+    row = array(typecode, blank)
+
+    for j in range(min(hi, len(y)) + 1):
+        prev[j - lo + 1] = j * indel
+    yield 0, prev, 1 - lo
+
+    for i in range(1, len(x) + 1):
+        row[:] = blank
+        if i <= -lo:
+            row[1 - lo - i] = i * indel
+        _band_row(
+            row, 1 - lo - i, prev, 2 - lo - i,
+            max(1, i + lo), min(len(y), i + hi),
+            profiles[x_codes[i - 1]], indel
+        )
+        yield i, row, 1 - lo - i
+        prev, row = row, prev
+
+def auto_band_edit(
+        penalties: dict, x: str, y: str, traceback: bool = True, stats: dict | None = None, max_bytes: int | None = None
+):
+    """
+    Banded alignment without guessing banded_width: start with a narrow band around the diagonals
+    between 0 and len(y) - len(x), and double its padding until the band's cost is provably optimal,
+    i.e. strictly below a lower bound on the cost of every path that leaves the band.
+    Such a band also traces back to exactly the alignment the full matrix would give.
+
+    The bound works on shifted costs: take `cheapest`, the lowest substitution cost, off every diagonal
+    step and half of it off every gap. Every complete path then moves by the same constant and no step
+    costs less than zero, provided a gap costs at least cheapest / 2 (otherwise nothing is proven until
+    the band covers the whole matrix). A path that leaves the band pays at least the band's cost up to
+    the edge cell it steps out of, plus one gap for every diagonal between where it lands and the end
+    cell's diagonal. Values are doubled to keep them integral.
+    :param stats: align()'s stats dict, if any, which every attempt's cells are added to
+    :param max_bytes: give up, returning None, rather than allocate a BandMatrix bigger than this
+    :return: the final BandMatrix, or just the cost if traceback is False
+    """
+    n = len(x)
+    m = len(y)
+    cheapest = min(_cost_table(penalties, x, y).values(), default=0)
+    gap2 = 2 * penalties["indel"] - cheapest
+    padding = AUTO_BAND_START
+
+    while True:
+        lo = max(min(0, m - n) - padding, -n)
+        hi = min(max(0, m - n) + padding, m)
+
+        if traceback and max_bytes is not None and _band_bytes(n + 1, lo, hi, _typecode(penalties)) > max_bytes:
+            return None
+
+        # Either way row[base + j] is (i, j) for every j in the band
+        if traceback:
+            matrix = diagonal_band_edit(penalties, x, y, lo, hi)
+            rows = ((i, matrix.row(i), -i - lo) for i in range(n + 1))
+        else:
+            rows = _band_score_rows(penalties, x, y, lo, hi)
+
+        # Stepping out is a left move off diagonal hi or an up move off diagonal lo
+        upper_exit = gap2 * (1 + abs(hi + 1 - (m - n)))
+        lower_exit = gap2 * (1 + abs(lo - 1 - (m - n)))
+
+        bound = float("inf")
+        for i, row, base in rows:
+            j = i + hi
+            if 0 <= j < m:
+                bound = min(bound, 2 * row[base + j] - cheapest * (i + j) + upper_exit)
+            j = i + lo
+            if 0 <= j and i < n:
+                bound = min(bound, 2 * row[base + j] - cheapest * (i + j) + lower_exit)
+        cost = row[base + m]
+        _count_fill(
+            stats, n, m, lo, hi,
+            matrix.nbytes if traceback else 2 * (hi - lo + 3) * array(_typecode(penalties)).itemsize
+        )
+
+        if gap2 < 0 and (lo, hi) != (-n, m):
+            bound = -float("inf")
+
+        if 2 * cost - cheapest * (n + m) < bound:
+            return matrix if traceback else cost
+        padding *= 2
+
+def max_cost_band(penalties: dict, x: str, y: str, max_cost):
+    """
+    The diagonals lo <= j - i <= hi that every alignment costing at most max_cost stays within,
+    from the shifted-cost bound of auto_band_edit(): straying d diagonals beyond those between 0 and
+    len(y) - len(x) costs at least 2 * d extra gaps. The band always traces back like the full matrix.
+    :return: (lo, hi), or None if no alignment can cost that little
+    """
+    n = len(x)
+    m = len(y)
+    cheapest = min(_cost_table(penalties, x, y).values(), default=0)
+    gap2 = 2 * penalties["indel"] - cheapest
+    budget = 2 * max_cost - cheapest * (n + m)
+
+    # An infinite max_cost (as from float('inf')) caps nothing
+    if gap2 <= 0 or budget == float('inf'):
+        return -n, m
+    if budget < gap2 * abs(m - n):
+        return None
+
+    padding = int((budget - gap2 * abs(m - n)) // (2 * gap2))
+    return max(min(0, m - n) - padding, -n), min(max(0, m - n) + padding, m)
+
+
+def capped_edit(
+        penalties: dict, x: str, y: str, max_cost, banded_width=-1, traceback: bool = True, stats: dict | None = None
+):
+    """
+    Alignment for screening against a cost threshold. Only the band of max_cost_band() is filled
+    (narrowed further by a numeric banded_width), and every ABANDON_CHECK_ROWS rows the fill stops
+    if no cell of the row can still reach the end within max_cost.
+    :param stats: align()'s stats dict, if any, which the rows actually filled are added to
+    :return: the BandMatrix, or just the cost if traceback is False; None once the cost provably exceeds max_cost
+    """
+    band = max_cost_band(penalties, x, y, max_cost)
+    if band is None:
+        _count_fill(stats, len(x), len(y), 0, 0, 0, rows=0)
+        return None
+    lo, hi = band
+    if banded_width not in (-1, 'auto'):
+        lo = max(lo, -banded_width)
+        hi = min(hi, banded_width)
+
+    n = len(x)
+    m = len(y)
+    cheapest = min(_cost_table(penalties, x, y).values(), default=0)
+    gap2 = 2 * penalties["indel"] - cheapest
+    budget = 2 * max_cost - cheapest * (n + m)
+
+    if traceback:
+        matrix = BandMatrix(n + 1, m + 1, lo, hi, _typecode(penalties))
+        rows = _band_edit_rows(penalties, x, y, matrix)
+        nbytes = matrix.nbytes
+    else:
+        rows = _band_score_rows(penalties, x, y, lo, hi)
+        nbytes = 2 * (hi - lo + 3) * array(_typecode(penalties)).itemsize
+
+    for i, row, base in rows:
+        # Same shifted costs as max_cost_band(): reaching the end diagonal from (i, j) takes at least one gap per diagonal
+        if gap2 >= 0 and i % ABANDON_CHECK_ROWS == 0 and all(
+                2 * row[base + j] - cheapest * (i + j) + gap2 * abs(m - n - j + i) > budget
+                for j in range(max(0, i + lo), min(m, i + hi) + 1)
+        ):
+            _count_fill(stats, n, m, lo, hi, nbytes, rows=i)
+            return None
+
+    _count_fill(stats, n, m, lo, hi, nbytes)
+    cost = row[base + m]
+    if cost > max_cost:
+        return None
+    return matrix if traceback else cost
+
+def _count_fill(stats: dict | None, n: int, m: int, lo: int, hi: int, nbytes: int, rows: int | None = None):
+    """
+    Add what a fill of the diagonals lo..hi over rows 1..rows (default all n) did to align()'s stats:
+    the cells it computed, and how often a cell's left or upper neighbour lay outside the band and
+    was read as a sentinel. matrix_bytes keeps the largest nbytes seen.
+    """
+    if stats is None:
+        return
+
+    cells = 0
+    sentinel_reads = 0
+    for i in range(1, (n if rows is None else rows) + 1):
+        start = max(1, i + lo)
+        end = min(m, i + hi)
+        if start <= end:
+            cells += end - start + 1
+            sentinel_reads += (i + lo >= 1) + (i + hi <= m)
+
+    stats['cells'] = (stats['cells'] or 0) + cells
+    stats['sentinel_reads'] = (stats['sentinel_reads'] or 0) + sentinel_reads
+    stats['matrix_bytes'] = max(stats['matrix_bytes'] or 0, nbytes)
+
+def _edit_row(prev, row, costs, indel):
+    """
+    Fill row[1:] from the row above; row[0] must already be set.
+    costs[j - 1] is the substitution cost of this row's character against y[j - 1].
+    """
+    # Carry the left neighbour in a local so only prev[] is read per cell
+    left = row[0]
+    for j in range(1, len(costs) + 1):
+        left = min(
+            costs[j - 1] + prev[j - 1],
+            indel + left,
+            indel + prev[j]
+        )
+        row[j] = left
+
+def _edit_row_moves(prev, row, codes, costs, indel):
+    """
+    _edit_row() that also records each cell's winning move in codes[j].
+    Ties go to the diagonal, then left, then up.
+    """
+    left = row[0]
+    for j in range(1, len(costs) + 1):
+        diag = costs[j - 1] + prev[j - 1]
+        gap_left = indel + left
+        up = indel + prev[j]
+
+        if diag <= gap_left and diag <= up:
+            left = diag
+            codes[j] = DIAG
+        elif gap_left <= up:
+            left = gap_left
+            codes[j] = LEFT
+        else:
+            left = up
+            codes[j] = UP
+
+        row[j] = left
+
+def _band_row(cells, base, prev_cells, prev_base, start, end, costs, indel):
+    """
+    Fill columns start..end of one band row.
+    cells[base + j] is (i, j) and prev_cells[prev_base + j] is (i - 1, j);
+    stepping off either edge of the band lands on a sentinel slot.
+    """
+    for j in range(start, end + 1):
+        cells[base + j] = min(
+            costs[j - 1] + prev_cells[prev_base + j - 1],
+            indel + prev_cells[prev_base + j],
+            indel + cells[base + j - 1]
+        )
+
+def _band_row_moves(cells, base, prev_cells, prev_base, codes, code_base, start, end, costs, indel):
+    """
+    _band_row() that also records each cell's winning move in codes[code_base + j],
+    with the same tie-break as _edit_row_moves()
+    """
+    for j in range(start, end + 1):
+        diag = costs[j - 1] + prev_cells[prev_base + j - 1]
+        up = indel + prev_cells[prev_base + j]
+        gap_left = indel + cells[base + j - 1]
+
+        if diag <= gap_left and diag <= up:
+            cells[base + j] = diag
+            codes[code_base + j] = DIAG
+        elif gap_left <= up:
+            cells[base + j] = gap_left
+            codes[code_base + j] = LEFT
+        else:
+            cells[base + j] = up
+            codes[code_base + j] = UP
 
 # def find_path(penalties: dict, gap: str, matrix: dict, x: str, y: str) -> tuple[int, str, str]:
     
@@ -155,97 +704,607 @@ def banded_edit(penalties: dict, x: str, y: str, banded_width: int) -> dict:
 
 #     return (matrix[(len(x), len(y))], outstr1, outstr2)
 
-def find_path(penalties: dict, gap: str, matrix: dict, x: str, y: str) -> tuple[int, str, str]:
+def find_path(penalties: dict, gap: str, matrix, x: str, y: str) -> tuple[int, str, str]:
     
     # print_matrix(matrix)
 
-    backwardsoutstr1 = ""
-    backwardsoutstr2 = ""
+    """
+    In case there is more than one optimal alignment, 
+    break ties with the following preference order: diagonal, left, top 
+    (put sequence 1 on the left of the matrix and sequence 2 on the top of the matrix).
+
+    The fill already applied that preference when it recorded each cell's move,
+    so this only walks the moves and never reads the scores.
+    """
+
+    # Fill both outputs from the back of buffers long enough for any path, pre-set to gaps
+    size = len(x) + len(y)
+    out1 = [gap] * size
+    out2 = [gap] * size
+    pos = size
 
     i = len(x)
     j = len(y)
+    move = matrix.move
+
+    while i > 0 and j > 0:
+        pos -= 1
+        direction = move(i, j)
+        if direction == DIAG:
+            out1[pos] = x[i - 1]
+            out2[pos] = y[j - 1]
+            i -= 1
+            j -= 1
+        elif direction == LEFT:
+            out2[pos] = y[j - 1]
+            j -= 1
+        else:
+            out1[pos] = x[i - 1]
+            i -= 1
+
+    while i > 0:
+        pos -= 1
+        out1[pos] = x[i - 1]
+        i -= 1
+
+    while j > 0:
+        pos -= 1
+        out2[pos] = y[j - 1]
+        j -= 1
+
+    return (matrix[(len(x), len(y))], ''.join(out1[pos:]), ''.join(out2[pos:]))
+
+
+def find_alignment(penalties: dict, gap: str, matrix, x: str, y: str) -> 'Alignment':
+    """
+    find_path() without building the gapped strings: walks the same moves but keeps only
+    the run-length operations, and returns an Alignment that renders the strings on demand.
+    """
+    runs = array('L')
+    i = len(x)
+    j = len(y)
+    move = matrix.move
+    last = None
+    length = 0
 
     while i > 0 or j > 0:
         if i > 0 and j > 0:
-            diag = calc_diag(penalties, matrix, x, y, i, j)
-            left = calc_left(penalties, matrix, i, j)
-            up = calc_up(penalties, matrix, i, j)
-
-            """
-            In case there is more than one optimal alignment, 
-            break ties with the following preference order: diagonal, left, top 
-            (put sequence 1 on the left of the matrix and sequence 2 on the top of the matrix).
-            """
-
-            if matrix[(i, j)] == diag:
-                backwardsoutstr1 += x[i - 1]
-                backwardsoutstr2 += y[j - 1]
-                i -= 1
-                j -= 1
-            elif matrix[(i, j)] == left:
-                backwardsoutstr1 += gap
-                backwardsoutstr2 += y[j - 1]
-                j -= 1
-            elif matrix[(i, j)] == up:
-                backwardsoutstr1 += x[i - 1]
-                backwardsoutstr2 += gap
-                i -= 1
-            else:
-                raise Exception("Error in backtracking") # Should not happen
-        elif i > 0:
-            backwardsoutstr1 += x[i - 1]
-            backwardsoutstr2 += gap
+            direction = move(i, j)
+        else:
+            direction = UP if i > 0 else LEFT
+
+        if direction != last and length:
+            runs.append(length << 2 | last)
+            length = 0
+        last = direction
+        length += 1
+
+        if direction == DIAG:
             i -= 1
-        elif j > 0:
-            backwardsoutstr1 += gap
-            backwardsoutstr2 += y[j - 1]
             j -= 1
+        elif direction == LEFT:
+            j -= 1
+        else:
+            i -= 1
 
-    outstr1 = backwardsoutstr1[::-1]
-    outstr2 = backwardsoutstr2[::-1]
+    if length:
+        runs.append(length << 2 | last)
+    runs.reverse()
+
+    return Alignment(matrix[(len(x), len(y))], x, y, runs, gap)
 
-    return (matrix[(len(x), len(y))], outstr1, outstr2)
-    
 
+def linear_space_path(penalties: dict, gap: str, x: str, y: str) -> tuple[int, str, str]:
+    """
+    Hirschberg-style divide and conquer: same result as find_path(penalties, gap, edit(penalties, x, y), x, y)
+    but never holds more than two rows (plus one small base-case matrix) at a time.
+    """
+    pieces1 = []
+    pieces2 = []
+    cost = _linear_space_split(penalties, gap, x, y, pieces1, pieces2)
+    return cost, ''.join(pieces1), ''.join(pieces2)
+
+def _linear_space_split(penalties: dict, gap: str, x: str, y: str, pieces1: list, pieces2: list):
+    if len(x) < 2 or (len(x) + 1) * (len(y) + 1) <= LINEAR_SPACE_BASE_CELLS:
+        cost, alignment1, alignment2 = find_path(penalties, gap, edit(penalties, x, y), x, y)
+        pieces1.append(alignment1)
+        pieces2.append(alignment2)
+        return cost
+
+    mid = len(x) // 2
+    cost, split = _crossing(penalties, x, y, mid)
+
+    # The traceback passes through (mid, split), so each half traces back exactly as it would inside the whole matrix
+    _linear_space_split(penalties, gap, x[:mid], y[:split], pieces1, pieces2)
+    _linear_space_split(penalties, gap, x[mid:], y[split:], pieces1, pieces2)
+
+    return cost
 
+def _crossing(penalties: dict, x: str, y: str, mid: int):
+    """
+    Run the forward fill over all of x with two rows, and for every cell below row mid track the
+    column where find_path()'s traceback from that cell first reaches row mid.
+    :return: the alignment cost and that column for the end cell
+    """
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+    typecode = _typecode(penalties)
+
+    prev = array(typecode, [j * indel for j in range(len(y) + 1)])
+    row = array(typecode, [0]) * (len(y) + 1)
 
-def get_start(i, banded_width):
-    if i - banded_width < 1:
-        return 1
-    return i - banded_width
+    for i in range(1, mid + 1):
+        row[0] = i * indel
+        _edit_row(prev, row, profiles[x_codes[i - 1]], indel)
+        prev, row = row, prev
 
-def get_end(i, banded_width, len_y):
-    if i + banded_width > len_y:
-        return len_y
-    return i + banded_width
+    prev_entry = array('i', range(len(y) + 1))
+    entry = array('i', [0]) * (len(y) + 1)
 
-def calc_diag(penalties: dict, matrix: dict, x, y, i, j):
-    try:
-        return diff(penalties, x[i - 1], y[j - 1]) + matrix[(i - 1, j - 1)]
-    except KeyError:
-        return float("inf")
+    for i in range(mid + 1, len(x) + 1):
+        row[0] = i * indel
+        entry[0] = 0
+        _edit_row_entry(prev, row, prev_entry, entry, profiles[x_codes[i - 1]], indel)
+        prev, row = row, prev
+        prev_entry, entry = entry, prev_entry
 
-def calc_up(penalties: dict, matrix: dict, i, j):
-    try:
-        return penalties["indel"] + matrix[(i - 1, j)]
-        # return penalties["indel"] + matrix[(i, j - 1)]
-    except KeyError:
-        return float("inf")
+    return prev[len(y)], prev_entry[len(y)]
+
+def _edit_row_entry(prev, row, prev_entry, entry, costs, indel):
+    """
+    _edit_row() that also carries each cell's crossing column along the move find_path() would take:
+    diagonal, then left, then up
+    """
+    left = row[0]
+    for j in range(1, len(costs) + 1):
+        diag = costs[j - 1] + prev[j - 1]
+        gap_left = indel + left
+        up = indel + prev[j]
+
+        if diag <= gap_left and diag <= up:
+            left = diag
+            entry[j] = prev_entry[j - 1]
+        elif gap_left <= up:
+            left = gap_left
+            entry[j] = entry[j - 1]
+        else:
+            left = up
+            entry[j] = prev_entry[j]
+
+        row[j] = left
 
-def calc_left(penalties: dict, matrix: dict, i, j):
-    try:
-        return penalties["indel"] + matrix[(i, j - 1)]
-        # return penalties["indel"] + matrix[(i - 1, j)]
-    except KeyError:
-        return float("inf")
 
 def diff(penalties: dict, char1, char2):
+    if penalties.get("costs") is not None:
+        return penalties["costs"].cost(char1, char2)
     return penalties["match"] if char1 == char2 else penalties["sub"]
 
 
+class CostTable:
+    """
+    Substitution costs between the characters of an alphabet, as a 2D table indexed by character code.
+    Sequences are encoded once into bytes of codes with str.translate, so looking up the cost of
+    a pair is two plain indexes instead of a comparison and a dict lookup.
+    """
+
+    def __init__(self, alphabet: str, costs):
+        """
+        :param alphabet: the characters the table covers; a character's code is its position here
+        :param costs: costs[a][b] is the cost of aligning alphabet[a] against alphabet[b]
+        """
+        if len(set(alphabet)) != len(alphabet) or len(alphabet) > 256:
+            raise ValueError("alphabet must be at most 256 distinct characters")
+        self.costs = [tuple(row) for row in costs]
+        if len(self.costs) != len(alphabet) or any(len(row) != len(alphabet) for row in self.costs):
+            raise ValueError(f"costs must be a {len(alphabet)}x{len(alphabet)} table")
+
+        self.alphabet = alphabet
+        self._translation = {ord(char): chr(code) for code, char in enumerate(alphabet)}
+
+    @classmethod
+    def match_sub(cls, alphabet: str, match_award, sub_penalty) -> 'CostTable':
+        """
+        The classic scoring: match_award on the diagonal, sub_penalty everywhere else
+        """
+        return cls(alphabet, [
+            [match_award if a == b else sub_penalty for b in alphabet]
+            for a in alphabet
+        ])
+
+    @classmethod
+    def transition_transversion(cls, match_award, transition, transversion, alphabet='ACGT') -> 'CostTable':
+        """
+        DNA scoring that charges less for transitions (purine <-> purine, pyrimidine <-> pyrimidine)
+        than for transversions. Case is ignored when classifying, so alphabet may be e.g. 'ACGTacgt'.
+        """
+        def cost(a, b):
+            if a.upper() == b.upper():
+                return match_award
+            if (a.upper() in 'AG') == (b.upper() in 'AG'):
+                return transition
+            return transversion
+
+        return cls(alphabet, [[cost(a, b) for b in alphabet] for a in alphabet])
+
+    def encode(self, seq: str) -> bytes:
+        if not set(seq) <= set(self.alphabet):
+            unknown = ''.join(sorted(set(seq) - set(self.alphabet)))
+            raise ValueError(f"characters {unknown!r} are not in the cost table's alphabet")
+        return seq.translate(self._translation).encode('latin-1')
+
+    def cost(self, char1, char2):
+        return self.costs[self.alphabet.index(char1)][self.alphabet.index(char2)]
+
+    def values(self):
+        for row in self.costs:
+            yield from row
+
+
+def _cost_table(penalties: dict, x: str, y: str) -> CostTable:
+    if penalties.get("costs") is not None:
+        return penalties["costs"]
+    return CostTable.match_sub(''.join(sorted(set(x) | set(y))), penalties["match"], penalties["sub"])
+
+
+def _swapped(penalties: dict) -> dict:
+    """
+    The penalties for aligning y against x instead of x against y: a cost table, which need not be symmetric,
+    is transposed
+    """
+    table = penalties.get("costs")
+    if table is None:
+        return penalties
+    return {**penalties, "costs": CostTable(table.alphabet, zip(*table.costs))}
+
+
+def _profiles(penalties: dict, x: str, y: str):
+    """
+    Encode x once and precompute, for every character of x, its cost against each position of y,
+    so the fill reads a cell's substitution cost with one index: profiles[x_codes[i - 1]][j - 1]
+    :return: x_codes, profiles
+    """
+    table = _cost_table(penalties, x, y)
+    typecode = _typecode(penalties)
+    x_codes = table.encode(x)
+    y_codes = table.encode(y)
+
+    profiles = [None] * len(table.alphabet)
+    for code in set(x_codes):
+        costs = table.costs[code]
+        profiles[code] = array(typecode, [costs[c] for c in y_codes])
+
+    return x_codes, profiles
+
+
+class Alignment:
+    """
+    A global alignment stored as its cost plus a run-length edit script: runs[k] = length << 2 | move,
+    with the move codes DIAG (a column with a character from both), LEFT (a gap in seq1) and UP (a gap in seq2).
+    The gapped strings are only built when asked for, whole (alignment1/alignment2), for a window of
+    alignment columns (alignment[start:stop]) or piece by piece into a file (write()).
+    Unpacks and compares like align()'s (cost, alignment1, alignment2) tuple.
+    """
+
+    def __init__(self, cost, x: str, y: str, runs: array, gap: str = '-'):
+        self.cost = cost
+        self.x = x
+        self.y = y
+        self.runs = runs
+        self.gap = gap
+
+    @classmethod
+    def from_strings(cls, cost, alignment1: str, alignment2: str, gap: str = '-') -> 'Alignment':
+        """
+        Compress an already rendered pair of gapped strings
+        """
+        runs = array('L')
+        last = None
+        length = 0
+        for char1, char2 in zip(alignment1, alignment2):
+            direction = LEFT if char1 == gap else UP if char2 == gap else DIAG
+            if direction != last and length:
+                runs.append(length << 2 | last)
+                length = 0
+            last = direction
+            length += 1
+        if length:
+            runs.append(length << 2 | last)
+
+        return cls(cost, alignment1.replace(gap, ''), alignment2.replace(gap, ''), runs, gap)
+
+    @property
+    def alignment1(self) -> str:
+        return ''.join(piece1 for piece1, _ in self._pieces(0, len(self)))
+
+    @property
+    def alignment2(self) -> str:
+        return ''.join(piece2 for _, piece2 in self._pieces(0, len(self)))
+
+    def cigar(self) -> str:
+        """
+        The edit script as a CIGAR string with seq2 as the reference: M aligned, I only in seq1, D only in seq2
+        """
+        return ''.join(f'{run >> 2}{"MDI"[run & 3]}' for run in self.runs)
+
+    def write(self, file, separator: str = '\n'):
+        """
+        Write alignment1 and then alignment2, each followed by separator, one run at a time,
+        so neither string is ever built in full
+        """
+        for side in (0, 1):
+            for pieces in self._pieces(0, len(self)):
+                file.write(pieces[side])
+            file.write(separator)
+
+    def __len__(self) -> int:
+        return sum(run >> 2 for run in self.runs)
+
+    def __iter__(self):
+        return iter((self.cost, self.alignment1, self.alignment2))
+
+    def __eq__(self, other) -> bool:
+        return tuple(self) == tuple(other)
+
+    def __getitem__(self, key):
+        """
+        alignment[0], [1] and [2] are the tuple's cost, alignment1 and alignment2;
+        alignment[start:stop] renders just those alignment columns as an (alignment1, alignment2) pair
+        """
+        if not isinstance(key, slice):
+            return tuple(self)[key]
+
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError('alignment slices do not support a step')
+        pieces = list(self._pieces(start, stop))
+        return ''.join(piece1 for piece1, _ in pieces), ''.join(piece2 for _, piece2 in pieces)
+
+    def _pieces(self, start: int, stop: int):
+        """
+        Yield both gapped strings between alignment columns start and stop, one (piece1, piece2) per edit run
+        """
+        column = i = j = 0
+
+        for run in self.runs:
+            if column >= stop:
+                break
+            length = run >> 2
+            direction = run & 3
+
+            # Clip the run to the requested window
+            skip = max(0, start - column)
+            take = min(length, stop - column) - skip
+            if take > 0:
+                if direction == DIAG:
+                    yield self.x[i + skip:i + skip + take], self.y[j + skip:j + skip + take]
+                elif direction == LEFT:
+                    yield self.gap * take, self.y[j + skip:j + skip + take]
+                else:
+                    yield self.x[i + skip:i + skip + take], self.gap * take
+
+            column += length
+            if direction != LEFT:
+                i += length
+            if direction != UP:
+                j += length
+
+
+class Matrix:
+    """
+    Dense DP matrix stored row-major in one flat array instead of a dict keyed by (i, j),
+    so filling it allocates no tuples and no boxed ints per cell.
+    Cell (i, j) lives at index i * cols + j; row(i) hands out a writable view of one row.
+    """
+
+    def __init__(self, rows: int, cols: int, typecode: str = 'i'):
+        self.rows = rows
+        self.cols = cols
+        self.cells = array(typecode, [0]) * (rows * cols)
+        self._view = memoryview(self.cells)
+        self.moves = Pointers(rows, cols)
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.itemsize * len(self.cells) + len(self.moves.packed)
+
+    def move(self, i: int, j: int) -> int:
+        return self.moves[i, j]
+
+    def row(self, i: int) -> memoryview:
+        start = i * self.cols
+        return self._view[start:start + self.cols]
+
+    def __contains__(self, key) -> bool:
+        i, j = key
+        return 0 <= i < self.rows and 0 <= j < self.cols
+
+    def __getitem__(self, key):
+        i, j = key
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise KeyError(key)
+        return self.cells[i * self.cols + j]
+
+    def __setitem__(self, key, value):
+        i, j = key
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise KeyError(key)
+        self.cells[i * self.cols + j] = value
+
+    def __len__(self) -> int:
+        return self.rows * self.cols
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        for i in range(self.rows):
+            for j, value in enumerate(self.row(i)):
+                yield (i, j), value
+
+
+class BandMatrix:
+    """
+    Banded DP matrix indexed by (row, diagonal offset) instead of (row, column).
+    The band is the diagonals lo <= j - i <= hi (lo = -k, hi = k for banded_width k);
+    row i keeps those cells at offset d = j - i - lo, in one flat array.
+    Each row is preceded by one sentinel slot, so reading one step left of the band or one step
+    right of the previous row's band hits a sentinel instead of raising.
+    Memory is (len(x) + 1) * (hi - lo + 2) cells no matter how long y is.
+    """
+
+    def __init__(self, rows: int, cols: int, lo: int, hi: int, typecode: str = 'i'):
+        self.rows = rows
+        self.cols = cols
+        self.lo = lo
+        self.hi = hi
+        self.width = hi - lo + 1
+        self.stride = self.width + 1
+        self.sentinel = _sentinel(typecode)
+        self.cells = array(typecode, [self.sentinel]) * (rows * self.stride)
+        self.moves = Pointers(rows, self.width)
+
+    @property
+    def nbytes(self) -> int:
+        return self.cells.itemsize * len(self.cells) + len(self.moves.packed)
+
+    def move(self, i: int, j: int) -> int:
+        return self.moves[i, j - i - self.lo]
+
+    def index(self, i: int, j: int) -> int:
+        return i * self.stride + j - i - self.lo + 1
+
+    def in_band(self, i: int, j: int) -> bool:
+        return 0 <= i < self.rows and 0 <= j < self.cols and self.lo <= j - i <= self.hi
+
+    def row(self, i: int) -> memoryview:
+        """
+        The band cells of row i; slot d holds column i + lo + d
+        """
+        start = i * self.stride + 1
+        return memoryview(self.cells)[start:start + self.width]
+
+    def __contains__(self, key) -> bool:
+        i, j = key
+        return self.in_band(i, j) and self.cells[self.index(i, j)] != self.sentinel
+
+    def __getitem__(self, key):
+        i, j = key
+        if not self.in_band(i, j):
+            return float("inf")
+        value = self.cells[self.index(i, j)]
+        return float("inf") if value == self.sentinel else value
+
+    def __setitem__(self, key, value):
+        i, j = key
+        if not self.in_band(i, j):
+            raise IndexError(f"{key} is outside the band of diagonals {self.lo}..{self.hi}")
+        self.cells[self.index(i, j)] = value
+
+    def __len__(self) -> int:
+        return self.rows * self.width
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        for i in range(self.rows):
+            for j in range(max(0, i + self.lo), min(self.cols, i + self.hi + 1)):
+                if (i, j) in self:
+                    yield (i, j), self[i, j]
+
+
+def _sentinel(typecode: str):
+    """
+    Value marking cells outside the band: larger than any real score, yet storable in the array.
+    """
+    if typecode == 'i':
+        return 2 ** 31 - 1
+    return float("inf")
+
+
+class Pointers:
+    """
+    The winning move (DIAG, LEFT or UP) of every cell, 2 bits each, packed four cells to a byte.
+    Each row starts on a byte boundary so set_row() can pack a whole row at once.
+    """
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.stride = (cols + 3) // 4
+        self.packed = bytearray(rows * self.stride)
+
+    def set_row(self, i: int, codes: bytes):
+        """
+        Pack one move code per byte into row i
+        """
+        start = i * self.stride
+        self.packed[start:start + self.stride] = _pack_codes(bytes(codes).ljust(4 * self.stride, b'\0'))
+
+    def __getitem__(self, key) -> int:
+        i, j = key
+        return (self.packed[i * self.stride + (j >> 2)] >> ((j & 3) << 1)) & 3
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+
+_LANE_SHIFTS = [bytes((code << shift) & 0xff for code in range(256)) for shift in (0, 2, 4, 6)]
+
+
+def _pack_codes(codes: bytes) -> bytes:
+    """
+    Pack move codes, one per byte, four to a byte in Pointers' layout; unused bits of the last byte are 0
+    """
+    stride = (len(codes) + 3) // 4
+    codes = codes.ljust(4 * stride, b'\0')
+    # Shift every fourth code into its 2-bit lane with translate() and OR the lanes as ints,
+    # so packing stays in C instead of looping over cells
+    packed = 0
+    for lane, shift in enumerate(_LANE_SHIFTS):
+        packed |= int.from_bytes(codes[lane::4].translate(shift), 'little')
+    return packed.to_bytes(stride, 'little')
+
+
+def _matrix_bytes(rows: int, cols: int, typecode: str) -> int:
+    """
+    Matrix(rows, cols, typecode).nbytes, without allocating it
+    """
+    return rows * cols * array(typecode).itemsize + rows * ((cols + 3) // 4)
+
+
+def _band_bytes(rows: int, lo: int, hi: int, typecode: str) -> int:
+    """
+    BandMatrix(rows, _, lo, hi, typecode).nbytes, without allocating it
+    """
+    width = hi - lo + 1
+    return rows * (width + 1) * array(typecode).itemsize + rows * ((width + 3) // 4)
+
+
+def _linear_bytes(n: int, m: int, typecode: str) -> int:
+    """
+    About the most linear_space_path() holds at once: its largest base-case matrix plus a few rows
+    """
+    cells = min((n + 1) * (m + 1), LINEAR_SPACE_BASE_CELLS)
+    return _matrix_bytes(1, cells, typecode) + 4 * (m + 1) * array(typecode).itemsize
+
+
+def _typecode(penalties: dict) -> str:
+    """
+    Pick the array typecode for a score matrix: C ints for the usual integer penalties,
+    doubles if any penalty (or cost table entry) is fractional.
+    """
+    values = [value for key, value in penalties.items() if key != "costs"]
+    if penalties.get("costs") is not None:
+        values.extend(penalties["costs"].values())
+    if all(isinstance(value, int) for value in values):
+        return 'i'
+    return 'd'
+
+
 
 
-def print_matrix(matrix: dict):
+def print_matrix(matrix):
     """
     Print the matrix in a human-readable format, pad-aligned for up to 3 digits
     (or 2 digits and a negative sign).
@@ -0,0 +1,150 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from alignment import align
+
+# Manifest columns passed straight through to align() as keyword arguments
+ALIGN_OPTIONS = (
+    'match_award', 'indel_penalty', 'sub_penalty', 'banded_width', 'gap', 'traceback', 'engine', 'max_cost',
+    'memory_budget'
+)
+
+# Each worker process opens the result cache once and reuses it for every pair it gets
+_caches = {}
+
+
+def read_manifest(path) -> Iterator[dict]:
+    """
+    Lazily read the pairs of a batch manifest.
+    A .jsonl manifest has one JSON object per line; anything else is read as a TSV with a header row.
+    Every pair needs seq1 and seq2 (a file path or the sequence itself) and may set an id and any of ALIGN_OPTIONS.
+    """
+    path = Path(path)
+    with path.open(newline='') as file:
+        if path.suffix == '.jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(file, delimiter='\t'):
+                yield {key: _parse_value(key, value) for key, value in row.items() if value not in (None, '')}
+
+
+def align_pair(pair: dict, cache: str | None = None, cache_bytes: int | None = None) -> dict:
+    """
+    Align one manifest pair and time it; runs in a worker process.
+    A pair that fails comes back with an 'error' instead of a score, so one bad pair does not stop the batch.
+    :param cache: path of an AlignmentCache database to answer repeated pairs from
+    :param cache_bytes: size limit for that cache
+    """
+    from main import _content_or_string
+
+    result = {'id': pair.get('id')}
+    start = time.perf_counter()
+    try:
+        options = {key: pair[key] for key in ALIGN_OPTIONS if key in pair}
+        seq1 = _content_or_string(pair['seq1'])
+        seq2 = _content_or_string(pair['seq2'])
+        if cache:
+            results = _open_cache(cache, cache_bytes)
+            hits = results.hits
+            score, alignment1, alignment2 = results.align(seq1, seq2, **options)
+            result['cached'] = results.hits > hits
+        else:
+            score, alignment1, alignment2 = align(seq1, seq2, **options)
+        result.update(score=score, alignment1=alignment1, alignment2=alignment2)
+    except Exception as error:
+        result['error'] = f'{type(error).__name__}: {error}'
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(
+        pairs: Iterable[dict],
+        output: TextIO,
+        workers: int | None = None,
+        in_flight: int | None = None,
+        ordered: bool = False,
+        cache: str | None = None,
+        cache_bytes: int | None = None
+) -> int:
+    """
+    Align every pair across a pool of worker processes and write one JSON line per pair as soon as it can be.
+    At most in_flight pairs are read from pairs and held in memory at once, so a manifest can be any length.
+    :param pairs: manifest entries, e.g. from read_manifest()
+    :param output: where to write the newline-delimited JSON results
+    :param workers: number of worker processes; defaults to one per CPU
+    :param in_flight: how many pairs may be queued or waiting to be written; defaults to 4 per worker
+    :param ordered: write results in manifest order instead of completion order
+    :param cache: path of an AlignmentCache database shared by the workers; results then say whether they were cached
+    :param cache_bytes: size limit for that cache; defaults to cache.CACHE_MAX_BYTES
+    :return: the number of pairs aligned
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or 4 * workers
+
+    pairs = iter(pairs)
+    pending = {}
+    finished = {}
+    next_index = 0
+    next_to_write = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # In order mode, results waiting on a slow earlier pair count against the limit too
+            oldest = next_to_write if ordered else next_index - len(pending)
+            while next_index - oldest < in_flight:
+                pair = next(pairs, None)
+                if pair is None:
+                    break
+                pending[pool.submit(align_pair, pair, cache, cache_bytes)] = next_index
+                next_index += 1
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                result = {'index': index, **future.result()}
+                if ordered:
+                    finished[index] = result
+                else:
+                    _write(output, result)
+
+            while next_to_write in finished:
+                _write(output, finished.pop(next_to_write))
+                next_to_write += 1
+
+    return next_index
+
+
+def _open_cache(path: str, max_bytes: int | None):
+    from cache import CACHE_MAX_BYTES, AlignmentCache
+
+    if path not in _caches:
+        _caches[path] = AlignmentCache(path, max_bytes or CACHE_MAX_BYTES)
+    return _caches[path]
+
+
+def _write(output: TextIO, result: dict):
+    output.write(json.dumps(result) + '\n')
+    output.flush()
+
+
+def _parse_value(key: str, value: str):
+    """
+    TSV cells are strings; turn the numeric and boolean align() options back into numbers and bools
+    """
+    if key in ('match_award', 'indel_penalty', 'sub_penalty', 'banded_width', 'max_cost', 'memory_budget'):
+        if value == 'auto':
+            return value
+        return float(value) if '.' in value else int(value)
+    if key == 'traceback':
+        return value.lower() not in ('0', 'false', 'no')
+    return value
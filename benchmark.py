@@ -0,0 +1,173 @@
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from alignment import align
+from sequences import read_sequence
+
+test_files = Path(__file__).parent / 'test_files'
+
+# Prefix lengths cut from both genomes
+SIZES = (100, 300, 1000, 3000, 10000, 31000)
+
+# Benchmark modes: name -> align() keyword arguments
+MODES = {
+    'matrix': {},
+    'banded-3': {'banded_width': 3},
+    'banded-10': {'banded_width': 10},
+    'banded-100': {'banded_width': 100},
+    'auto': {'banded_width': 'auto'},
+    'linear': {'engine': 'linear'},
+    'numpy': {'engine': 'numpy'},
+    'tiled': {'engine': 'tiled'},
+    'seed': {'engine': 'seed'},
+    'score-only': {'traceback': False},
+    'score-only-banded-3': {'banded_width': 3, 'traceback': False},
+    'score-only-auto': {'banded_width': 'auto', 'traceback': False},
+}
+
+# Modes that fill the whole n x m matrix are skipped above this many cells unless asked for
+MAX_FULL_CELLS = 10_000_000
+
+# A case is flagged when it is this much slower, or uses this much more memory, than the baseline
+REGRESSION_TOLERANCE = 0.25
+
+
+def run_case(mode: str, size: int, repeat: int = 1, trace: bool = False) -> dict:
+    """
+    Time align() in one mode on the first size characters of both genomes; meant to run in a fresh process
+    so that its peak RSS belongs to this case alone.
+    cells is the nominal (n + 1) * (m + 1) for every mode, so cells_per_second compares modes on equal terms.
+    """
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:size]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:size]
+    options = MODES[mode]
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        score, _, _ = align(seq1, seq2, **options)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    cells = (len(seq1) + 1) * (len(seq2) + 1)
+    result = {
+        'mode': mode,
+        'size': size,
+        'options': options,
+        'score': score,
+        'seconds': seconds,
+        'cells': cells,
+        'cells_per_second': cells / seconds if seconds else None,
+        # ru_maxrss is in KiB on Linux but bytes on macOS
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    }
+
+    if trace:
+        # A separate run, so tracing does not slow down the timed ones
+        tracemalloc.start()
+        align(seq1, seq2, **options)
+        result['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+
+def run_suite(
+        modes=tuple(MODES),
+        sizes=SIZES,
+        repeat: int = 1,
+        trace: bool = False,
+        max_full_cells: int = MAX_FULL_CELLS,
+        log=None
+) -> list[dict]:
+    """
+    Run every mode at every size, each case in its own child process.
+    Cases of whole-matrix modes above max_full_cells are recorded as skipped.
+    """
+    results = []
+    for size in sizes:
+        for mode in modes:
+            options = MODES[mode]
+            whole_matrix = options.get('banded_width', -1) == -1 and options.get('engine') != 'seed'
+            if whole_matrix and (size + 1) ** 2 > max_full_cells:
+                results.append({'mode': mode, 'size': size, 'options': options, 'skipped': True})
+                continue
+
+            try:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    result = pool.submit(run_case, mode, size, repeat, trace).result()
+            except ImportError as error:
+                # e.g. numpy is not installed
+                results.append({'mode': mode, 'size': size, 'options': options, 'skipped': True, 'reason': str(error)})
+                continue
+            results.append(result)
+            if log:
+                print(
+                    f"{mode:>20} {size:>6} {result['seconds']:10.4f}s "
+                    f"{result['cells_per_second']:14,.0f} cells/s {result['peak_rss_bytes'] / 2 ** 20:8.1f} MiB",
+                    file=log
+                )
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float = REGRESSION_TOLERANCE) -> list[dict]:
+    """
+    Cases that got slower or bigger than in the baseline by more than tolerance, or whose score changed
+    """
+    previous = {(case['mode'], case['size']): case for case in baseline if not case.get('skipped')}
+    regressions = []
+
+    for case in results:
+        before = previous.get((case['mode'], case['size']))
+        if before is None or case.get('skipped'):
+            continue
+        for metric in ('seconds', 'peak_rss_bytes', 'peak_traced_bytes'):
+            if metric in case and metric in before and case[metric] > before[metric] * (1 + tolerance):
+                regressions.append({
+                    'mode': case['mode'], 'size': case['size'], 'metric': metric,
+                    'baseline': before[metric], 'now': case[metric]
+                })
+        if case['score'] != before['score']:
+            regressions.append({
+                'mode': case['mode'], 'size': case['size'], 'metric': 'score',
+                'baseline': before['score'], 'now': case['score']
+            })
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark align() on prefixes of the bundled genomes')
+    parser.add_argument('--modes', nargs='+', choices=tuple(MODES), default=tuple(MODES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--repeat', type=int, default=1, help='Keep the best of this many timed runs')
+    parser.add_argument('--tracemalloc', action='store_true', help='Also measure peak traced Python memory')
+    parser.add_argument('--max-full-cells', type=int, default=MAX_FULL_CELLS,
+                        help='Skip whole-matrix modes above this many cells')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results')
+    parser.add_argument('--baseline', help='Earlier results file to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_suite(args.modes, args.sizes, args.repeat, args.tracemalloc, args.max_full_cells, log=sys.stderr)
+    Path(args.output).write_text(json.dumps({
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results
+    }, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text())['results'], args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['mode']} {regression['size']} {regression['metric']}: "
+                f"{regression['baseline']} -> {regression['now']}",
+                file=sys.stderr
+            )
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+from alignment import Alignment, align
+
+# Default on-disk budget: 256 MiB of stored alignments
+CACHE_MAX_BYTES = 256 << 20
+
+# Results kept in the in-process LRU in front of the database
+CACHE_MEMORY_ENTRIES = 256
+
+# Engines that always return the optimal alignment with find_path()'s tie-breaks, and so share cache entries
+_EXACT_ENGINES = ('matrix', 'linear', 'numpy', 'tiled', 'auto')
+
+
+def cache_key(seq1: str, seq2: str, **options) -> str:
+    """
+    Content address of an align() call: a SHA-256 over the sequences and every option that can change the result.
+    The exact engines all produce the same alignment, so they hash alike; 'seed' does not.
+    compact only changes how the result is wrapped, so it is left out.
+    """
+    engine = options.get('engine', 'matrix')
+    costs = options.get('costs')
+    parameters = {
+        'match_award': options.get('match_award', -3),
+        'indel_penalty': options.get('indel_penalty', 5),
+        'sub_penalty': options.get('sub_penalty', 1),
+        'banded_width': options.get('banded_width', -1),
+        'gap': options.get('gap', '-'),
+        'traceback': options.get('traceback', True),
+        'engine': 'exact' if engine in _EXACT_ENGINES else engine,
+        'costs': None if costs is None else [costs.alphabet, costs.costs],
+        'seed_kmer': options.get('seed_kmer') if engine == 'seed' else None,
+        'max_cost': options.get('max_cost')
+    }
+
+    digest = hashlib.sha256()
+    for part in (seq1, seq2, json.dumps(parameters, sort_keys=True)):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class AlignmentCache:
+    """
+    align() results stored in a SQLite file, keyed by cache_key(), with a small LRU of recent results in memory.
+    When the stored results outgrow max_bytes the least recently used ones are evicted.
+    Several processes may share one file; SQLite serializes their writes.
+    """
+
+    def __init__(self, path, max_bytes: int = CACHE_MAX_BYTES, memory_entries: int = CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._memory = OrderedDict()
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+        self._db.commit()
+
+    def align(self, seq1: str, seq2: str, **options) -> 'tuple[float, str | None, str | None] | Alignment':
+        """
+        align(seq1, seq2, **options), answered from the cache when the same call has been made before.
+        Results are stored as the plain tuple; with compact=True an alignment comes back as an Alignment again.
+        """
+        key = cache_key(seq1, seq2, **options)
+        result = self.get(key)
+        if result is None:
+            self.misses += 1
+            result = tuple(align(seq1, seq2, **options))
+            self.put(key, result)
+        else:
+            self.hits += 1
+
+        if options.get('compact') and result[1] is not None:
+            return Alignment.from_strings(*result, options.get('gap', '-'))
+        return result
+
+    def get(self, key: str) -> tuple | None:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        row = self._db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        with self._db:
+            self._db.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+        result = tuple(json.loads(row[0]))
+        self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: tuple):
+        value = json.dumps(result)
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO results (key, value, size, used) VALUES (?, ?, ?, ?)',
+                (key, value, len(value), time.time())
+            )
+            self._evict()
+        self._remember(key, tuple(result))
+
+    def stats(self) -> dict:
+        entries, stored = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': stored
+        }
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remember(self, key: str, result: tuple):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        stored = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if stored <= self.max_bytes:
+            return
+
+        for key, size in self._db.execute('SELECT key, size FROM results ORDER BY used').fetchall():
+            self._db.execute('DELETE FROM results WHERE key = ?', (key,))
+            self._memory.pop(key, None)
+            self.evictions += 1
+            stored -= size
+            if stored <= self.max_bytes:
+                break
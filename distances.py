@@ -0,0 +1,155 @@
+import ast
+import math
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from alignment import align, reaching_band
+
+# Pairs handed to a worker at a time, so short pairs do not drown in scheduling overhead
+DISTANCE_CHUNK = 16
+
+# How often finished cells are flushed to disk, in seconds
+FLUSH_SECONDS = 1.0
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+# Set in each worker by _init_worker(), so the sequences are sent once per worker instead of once per pair
+_sequences = None
+_options = None
+
+
+def distance_matrix(
+        sequences: list[str],
+        path,
+        match_award=-3,
+        indel_penalty=5,
+        sub_penalty=1,
+        banded_width=-1,
+        workers: int | None = None,
+        chunk: int = DISTANCE_CHUNK
+) -> int:
+    """
+    Alignment cost of every pair of sequences, written to path as an N x N float64 .npy file
+    (np.load(path, mmap_mode='r') reads it; NumPy itself is not needed to write it).
+    Only pairs i <= j are aligned, score-only, by a pool of worker processes, longest pairs first
+    so no worker is left with a big pair at the end; each cost goes to both [i, j] and [j, i].
+    Cells not computed yet hold NaN. If path already holds a matrix of the right size, its finished
+    cells are kept and only the NaN ones are aligned, so an interrupted run picks up where it stopped.
+    A numeric banded_width is widened for each pair to at least the difference of their lengths.
+    :return: the number of pairs aligned by this call
+    """
+    n = len(sequences)
+    data, cells = _open_matrix(path, n)
+    try:
+        pairs = [(i, j) for i in range(n) for j in range(i, n) if math.isnan(cells[i * n + j])]
+        pairs.sort(key=lambda pair: len(sequences[pair[0]]) * len(sequences[pair[1]]), reverse=True)
+        if not pairs:
+            return 0
+
+        options = {
+            'match_award': match_award,
+            'indel_penalty': indel_penalty,
+            'sub_penalty': sub_penalty,
+            'banded_width': banded_width
+        }
+        workers = workers or os.cpu_count() or 1
+        chunks = iter([pairs[start:start + chunk] for start in range(0, len(pairs), chunk)])
+        pending = set()
+        flushed = time.monotonic()
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(sequences, options)) as pool:
+            while True:
+                # Keep every worker busy with one chunk queued behind it
+                while len(pending) < 2 * workers:
+                    batch = next(chunks, None)
+                    if batch is None:
+                        break
+                    pending.add(pool.submit(_align_chunk, batch))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for i, j, cost in future.result():
+                        cells[i * n + j] = cost
+                        cells[j * n + i] = cost
+
+                if time.monotonic() - flushed >= FLUSH_SECONDS:
+                    data.flush()
+                    flushed = time.monotonic()
+
+        return len(pairs)
+    finally:
+        cells.release()
+        data.flush()
+        data.close()
+
+
+def read_distance_matrix(path) -> list[list[float]]:
+    """
+    The matrix written by distance_matrix() as nested lists, for use without NumPy
+    """
+    with open(path, 'rb') as file:
+        n, offset = _read_header(file)
+        file.seek(offset)
+        values = struct.unpack(f'<{n * n}d', file.read(8 * n * n))
+    return [list(values[i * n:(i + 1) * n]) for i in range(n)]
+
+
+def _init_worker(sequences: list[str], options: dict):
+    global _sequences, _options
+    _sequences = sequences
+    _options = options
+
+
+def _align_chunk(pairs: list[tuple[int, int]]) -> list[tuple[int, int, float]]:
+    return [(i, j, _distance(_sequences[i], _sequences[j])) for i, j in pairs]
+
+
+def _distance(seq1: str, seq2: str) -> float:
+    banded_width = reaching_band(_options['banded_width'], seq1, seq2)
+    return align(seq1, seq2, traceback=False, **{**_options, 'banded_width': banded_width})[0]
+
+
+def _open_matrix(path, n: int):
+    """
+    Memory-map path as an n x n little-endian float64 .npy file, creating it full of NaN if it does not exist yet
+    :return: the mmap and a flat memoryview of its n * n doubles
+    """
+    path = Path(path)
+    if not path.exists():
+        header = f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({n}, {n}), }}"
+        # The header is padded so the data starts on a 64-byte boundary, as the format asks
+        header += ' ' * (-(len(_NPY_MAGIC) + 2 + len(header) + 1) % 64) + '\n'
+        with path.open('wb') as file:
+            file.write(_NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin-1'))
+            file.write(struct.pack('<d', math.nan) * (n * n))
+
+    with path.open('r+b') as file:
+        size, offset = _read_header(file)
+        if size != n:
+            raise ValueError(f'{path} holds a {size} x {size} matrix, not {n} x {n}')
+        data = mmap.mmap(file.fileno(), 0)
+
+    return data, memoryview(data)[offset:offset + 8 * n * n].cast('d')
+
+
+def _read_header(file) -> tuple[int, int]:
+    """
+    Check a .npy header is one distance_matrix() can use
+    :return: the matrix size and the offset of its data
+    """
+    prefix = file.read(len(_NPY_MAGIC) + 2)
+    if prefix[:len(_NPY_MAGIC)] != _NPY_MAGIC:
+        raise ValueError(f'{file.name} is not a version 1.0 .npy file')
+    length, = struct.unpack('<H', prefix[len(_NPY_MAGIC):])
+    header = ast.literal_eval(file.read(length).decode('latin-1'))
+
+    shape = header['shape']
+    if header['descr'] != '<f8' or header['fortran_order'] or len(shape) != 2 or shape[0] != shape[1]:
+        raise ValueError(f'{file.name} is not a square little-endian float64 matrix')
+    return shape[0], len(prefix) + length
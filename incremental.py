@@ -0,0 +1,133 @@
+from array import array
+
+from alignment import UP, _edit_row_moves, _pack_codes, _profiles, _typecode, find_path
+
+
+class IncrementalAligner:
+    """
+    A full Needleman-Wunsch alignment of seq1 against seq2 that can be grown in place.
+    Every cell's move is kept, packed 2 bits per cell as in Pointers with one bytearray per row,
+    but of the scores only the last row and the last column, which are all that new rows or columns are filled from.
+    Appending k characters to seq1 fills k new rows: O(k * len(seq2)).
+    Appending k characters to seq2 fills k new columns: O(len(seq1) * k).
+    The result is always the same as align() on the whole sequences.
+    """
+
+    def __init__(
+            self,
+            seq1: str = '',
+            seq2: str = '',
+            match_award=-3,
+            indel_penalty=5,
+            sub_penalty=1,
+            gap='-',
+            costs=None
+    ):
+        self.penalties = {
+            'match': match_award,
+            'indel': indel_penalty,
+            'sub': sub_penalty,
+            'costs': costs
+        }
+        self.gap = gap
+        self._typecode = _typecode(self.penalties)
+        self._reset()
+        self.extend(seq1, seq2)
+
+    def align(self, seq1: str, seq2: str) -> tuple[float, str, str]:
+        """
+        Align seq1 against seq2, reusing everything already computed when they extend the current sequences
+        (and starting over when they do not)
+        """
+        if not (seq1.startswith(self.seq1) and seq2.startswith(self.seq2)):
+            self._reset()
+        self.extend(seq1[len(self.seq1):], seq2[len(self.seq2):])
+        return self.result()
+
+    def extend(self, more1: str = '', more2: str = ''):
+        """
+        Append more1 to seq1 and more2 to seq2, filling only the new columns and then the new rows
+        """
+        if more2:
+            self._add_columns(more2)
+        if more1:
+            self._add_rows(more1)
+
+    def result(self) -> tuple[float, str, str]:
+        """
+        The cost and alignment strings of the current sequences
+        """
+        return find_path(self.penalties, self.gap, self, self.seq1, self.seq2)
+
+    def move(self, i: int, j: int) -> int:
+        return (self._moves[i][j >> 2] >> ((j & 3) << 1)) & 3
+
+    def __getitem__(self, key):
+        i, j = key
+        if i == len(self.seq1):
+            return self._last_row[j]
+        if j == len(self.seq2):
+            return self._last_column[i]
+        raise KeyError(f'only the last row and column of scores are kept, not {key}')
+
+    def _reset(self):
+        self.seq1 = ''
+        self.seq2 = ''
+        self._last_row = array(self._typecode, [0])
+        self._last_column = array(self._typecode, [0])
+        self._moves = [bytearray(1)]
+
+    def _add_columns(self, more2: str):
+        indel = self.penalties["indel"]
+        start = len(self.seq2)
+        x_codes, profiles = _profiles(self.penalties, self.seq1, more2)
+
+        # Each row's new cells, with its old last cell (column start) in slot 0 as the kernels expect
+        prev = array(self._typecode, [(start + j) * indel for j in range(len(more2) + 1)])
+        row = array(self._typecode, prev)
+        codes = bytearray(len(more2) + 1)
+
+        _append_moves(self._moves[0], start + 1, bytes(len(more2)))
+        for i in range(1, len(self.seq1) + 1):
+            row[0] = self._last_column[i]
+            _edit_row_moves(prev, row, codes, profiles[x_codes[i - 1]], indel)
+            _append_moves(self._moves[i], start + 1, codes[1:])
+            self._last_column[i - 1] = prev[-1]
+            prev, row = row, prev
+
+        self._last_column[len(self.seq1)] = prev[-1]
+        self._last_row.extend(prev[1:])
+        self.seq2 += more2
+
+    def _add_rows(self, more1: str):
+        indel = self.penalties["indel"]
+        start = len(self.seq1)
+        x_codes, profiles = _profiles(self.penalties, more1, self.seq2)
+
+        prev = self._last_row
+        row = array(self._typecode, prev)
+        codes = bytearray(len(self.seq2) + 1)
+        codes[0] = UP
+
+        for i in range(1, len(more1) + 1):
+            row[0] = (start + i) * indel
+            _edit_row_moves(prev, row, codes, profiles[x_codes[i - 1]], indel)
+            self._moves.append(bytearray(_pack_codes(bytes(codes))))
+            self._last_column.append(row[-1])
+            prev, row = row, prev
+
+        self._last_row = prev
+        self.seq1 += more1
+
+
+
+def _append_moves(packed: bytearray, cols: int, codes: bytes):
+    """
+    Append move codes to a packed row that holds cols cells; a partly used last byte is filled first
+    """
+    offset = cols & 3
+    more = _pack_codes(bytes(offset) + codes)
+    if offset:
+        packed[-1] |= more[0]
+        more = more[1:]
+    packed += more
@@ -0,0 +1,136 @@
+from array import array
+from typing import NamedTuple
+
+from alignment import _cost_table, _edit_row, _profiles, _typecode, align, reaching_band
+
+
+class LocalAlignment(NamedTuple):
+    """
+    The best local alignment: its cost, the regions seq1[start1:end1] and seq2[start2:end2] it aligns,
+    and their gapped strings (None for a score-only alignment)
+    """
+    cost: float
+    start1: int
+    end1: int
+    start2: int
+    end2: int
+    alignment1: str | None
+    alignment2: str | None
+
+
+def local_align(
+        seq1: str,
+        seq2: str,
+        match_award=-3,
+        indel_penalty=5,
+        sub_penalty=1,
+        banded_width=-1,
+        gap='-',
+        traceback=True,
+        costs=None
+) -> LocalAlignment:
+    """
+    Smith-Waterman: the lowest-cost alignment between any region of seq1 and any region of seq2,
+    e.g. to find a gene in a genome. As costs are minimised, a region is only worth aligning if it costs
+    less than 0, so a cell restarts from 0 rather than go above it, and with no negative cost at all
+    the result is empty.
+    Runs in three steps, the first over the whole matrix and the others over the best region only:
+    - a fill keeping two rows of len(seq2) + 1 cells finds the cost and where the best region ends
+    - a fill backwards from that end, over at most the stretch a region of that cost can span, finds its start
+    - unless traceback is False, align() of the two regions gives the strings; banded_width bands this
+      alignment, widened if needed to reach the region's end cell. The cost returned is then that of
+      the banded strings, which a narrow band can leave above the score-only cost.
+    """
+    penalties = {
+        'match': match_award,
+        'indel': indel_penalty,
+        'sub': sub_penalty,
+        'costs': costs
+    }
+    cost, end1, end2 = _local_end(penalties, seq1, seq2)
+    if cost >= 0:
+        return LocalAlignment(0, 0, 0, 0, 0, '' if traceback else None, '' if traceback else None)
+
+    start1, start2 = _local_start(penalties, seq1[:end1], seq2[:end2])
+    if not traceback:
+        return LocalAlignment(cost, start1, end1, start2, end2, None, None)
+
+    region1 = seq1[start1:end1]
+    region2 = seq2[start2:end2]
+    # A numeric band may miss the region's best alignment, so the cost is what the returned strings cost
+    cost, alignment1, alignment2 = align(
+        region1, region2, match_award, indel_penalty, sub_penalty, reaching_band(banded_width, region1, region2), gap,
+        costs=costs
+    )
+    return LocalAlignment(cost, start1, end1, start2, end2, alignment1, alignment2)
+
+
+def _local_end(penalties: dict, x: str, y: str) -> tuple[float, int, int]:
+    """
+    The local alignment fill in two rows
+    :return: the best cost and the first cell (row-major) that reaches it
+    """
+    indel = penalties["indel"]
+    x_codes, profiles = _profiles(penalties, x, y)
+    typecode = _typecode(penalties)
+
+    prev = array(typecode, [0]) * (len(y) + 1)
+    row = array(typecode, [0]) * (len(y) + 1)
+    best, end1, end2 = 0, 0, 0
+
+    for i in range(1, len(x) + 1):
+        _local_row(prev, row, profiles[x_codes[i - 1]], indel)
+        lowest = min(row)
+        if lowest < best:
+            best, end1, end2 = lowest, i, row.index(lowest)
+        prev, row = row, prev
+
+    return best, end1, end2
+
+
+def _local_row(prev, row, costs, indel):
+    """
+    _edit_row() floored at 0, where a local alignment may start afresh; row[0] is always 0
+    """
+    left = 0
+    for j in range(1, len(costs) + 1):
+        left = min(
+            costs[j - 1] + prev[j - 1],
+            indel + left,
+            indel + prev[j],
+            0
+        )
+        row[j] = left
+
+
+def _local_start(penalties: dict, x: str, y: str) -> tuple[int, int]:
+    """
+    Where the best local alignment ending at the ends of x and y starts: a global fill of x and y reversed,
+    anchored at their ends, reaches its lowest cost at the start.
+    A region can only span so much more of one sequence than of the other before its gaps cost more than
+    its best matches could win back, so only that much of each is filled.
+    """
+    indel = penalties["indel"]
+    end1 = len(x)
+    end2 = len(y)
+    cheapest = min(_cost_table(penalties, x, y).values())
+    if indel > 0:
+        ratio = 1 - cheapest / indel
+        x = x[-min(len(x), int(len(y) * ratio) + 1):]
+        y = y[-min(len(y), int(len(x) * ratio) + 1):]
+
+    x_codes, profiles = _profiles(penalties, x[::-1], y[::-1])
+    typecode = _typecode(penalties)
+    prev = array(typecode, [j * indel for j in range(len(y) + 1)])
+    row = array(typecode, [0]) * (len(y) + 1)
+    best, length1, length2 = prev[0], 0, 0
+
+    for i in range(1, len(x) + 1):
+        row[0] = i * indel
+        _edit_row(prev, row, profiles[x_codes[i - 1]], indel)
+        lowest = min(row)
+        if lowest < best:
+            best, length1, length2 = lowest, i, row.index(lowest)
+        prev, row = row, prev
+
+    return end1 - length1, end2 - length2
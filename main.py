@@ -1,22 +1,63 @@
+import json
+import sys
+import time
 from argparse import ArgumentParser
 from pathlib import Path
 
 from alignment import align
+from sequences import read_sequence
 
 
-def main(seq1: str, seq2: str):
+def main(
+        seq1: str,
+        seq2: str,
+        cache: str | None = None,
+        cache_bytes: int | None = None,
+        cigar: bool = False,
+        stats: dict | None = None,
+        banded_width=-1
+):
     """
     Align the two sequences and print the score and alignment strings
+    :param cache: path of an AlignmentCache database to look the result up in (and store it to)
+    :param cache_bytes: size limit for that cache
+    :param cigar: print the CIGAR edit script instead of the alignment strings
+    :param stats: if given, add align()'s stats and the output time to it and print it to stderr as one JSON line
+    :param banded_width: passed on to align()
     """
-    score, alignment1, alignment2 = align(seq1, seq2)
-    print(f'Score: {score}')
-    print(alignment1)
-    print(alignment2)
+    timings = {} if stats is not None else None
+    if cache:
+        from cache import CACHE_MAX_BYTES, AlignmentCache
+        with AlignmentCache(cache, cache_bytes or CACHE_MAX_BYTES) as results:
+            result = results.align(seq1, seq2, banded_width=banded_width, compact=True, stats=timings)
+            if stats is not None:
+                stats['cache_hit'] = results.hits > 0
+    else:
+        result = align(seq1, seq2, banded_width=banded_width, compact=True, stats=timings)
+
+    output_started = time.perf_counter()
+    print(f'Score: {result.cost}')
+    if cigar:
+        print(result.cigar())
+    else:
+        # Streamed run by run rather than built as two whole strings first
+        result.write(sys.stdout)
+
+    if stats is not None:
+        stats.update(timings)
+        stats['output_seconds'] = time.perf_counter() - output_started
+        print(json.dumps(stats), file=sys.stderr)
 
 
 def _content_or_string(could_be_path):
-    if (s1file := Path(could_be_path)).exists():
-        return s1file.read_text()
+    s1file = Path(could_be_path)
+    try:
+        is_file = s1file.exists()
+    except OSError:
+        # e.g. a genome-length sequence is too long to even be a file name
+        is_file = False
+    if is_file:
+        return read_sequence(s1file)
     else:
         # assume it's the sequence string, not a file name
         return could_be_path
@@ -24,11 +65,114 @@ def _content_or_string(could_be_path):
 
 if __name__ == '__main__':
     parser = ArgumentParser()
-    parser.add_argument('seq1_file', help='Path to file containing sequence 1')
-    parser.add_argument('seq2_file', help='Path to file containing sequence 2')
+    parser.add_argument('seq1_file', nargs='?', help='Path to file containing sequence 1')
+    parser.add_argument('seq2_file', nargs='?', help='Path to file containing sequence 2')
+    parser.add_argument('--batch', help='Align every pair in this TSV or JSONL manifest instead')
+    parser.add_argument('--all-vs-all', help='Write the alignment cost of every pair of records in this FASTA file')
+    parser.add_argument('--banded-width', default=-1, type=lambda value: value if value == 'auto' else int(value),
+                        help="Band for a pair, --local, --all-vs-all and --search: a width, 'auto', or -1 for none; "
+                             "for --window, the band's padding (default: 100)")
+    parser.add_argument('--serve', metavar='SOCKET', help='Serve line-delimited JSON align requests on this Unix socket')
+    parser.add_argument('--database', help='Sequence database file for --index and --search')
+    parser.add_argument('--index', nargs='+', help='Add every record of these FASTA files to --database')
+    parser.add_argument('--search', help='Print the sequences in --database closest to this sequence or file')
+    parser.add_argument('--top', type=int, default=5, help='How many --search hits to print')
+    parser.add_argument('--local', action='store_true',
+                        help='Find and print the best local alignment (Smith-Waterman) of the two sequences')
+    parser.add_argument('--window', type=int, help='Print the alignment cost of each window of seq1 as JSON lines')
+    parser.add_argument('--stride', type=int, help='Distance between --window starts (default: the window)')
+    parser.add_argument('--output', help='Where to write the batch results as JSON lines (default: stdout), '
+                                         'or the .npy matrix for --all-vs-all')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--in-flight', type=int, help='Most pairs queued at once (default: 4 per worker)')
+    parser.add_argument('--ordered', action='store_true', help='Write batch results in manifest order')
+    parser.add_argument('--cache', help='SQLite file to reuse alignment results from across runs')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print input, fill, traceback and output timings and counters to stderr as JSON')
+    parser.add_argument('--cigar', action='store_true', help='Print a CIGAR string instead of the alignment')
+    parser.add_argument('--cache-mb', type=int, help='Size limit of the cache in MiB (default: 256)')
     args = parser.parse_args()
+    cache_bytes = args.cache_mb << 20 if args.cache_mb else None
+    if args.banded_width != -1 and (args.serve or args.batch):
+        parser.error('--banded-width does not apply to --serve or --batch; set banded_width per request')
+
+    if args.serve:
+        import asyncio
+        from service import AlignmentService
+
+        try:
+            asyncio.run(AlignmentService(args.workers).serve(args.serve))
+        except KeyboardInterrupt:
+            pass
+    elif args.index or args.search:
+        from search import SequenceDatabase
+
+        if not args.database:
+            parser.error('--index and --search need --database')
+        with SequenceDatabase(args.database) as database:
+            for path in args.index or ():
+                print(f'Indexed {database.add_file(path)} sequences from {path}', file=sys.stderr)
+            if args.search:
+                for hit in database.search(_content_or_string(args.search), args.top, banded_width=args.banded_width):
+                    print(json.dumps(hit._asdict()))
+    elif args.all_vs_all:
+        from distances import distance_matrix
+        from sequences import read_records
+
+        if not args.output:
+            parser.error('--all-vs-all needs --output for the .npy matrix')
+        records = list(read_records(args.all_vs_all))
+        aligned = distance_matrix(
+            [record.sequence.decode('latin-1') for record in records], args.output,
+            banded_width=args.banded_width, workers=args.workers
+        )
+        # Row and column k of the matrix is the k-th record
+        Path(args.output).with_suffix('.names.txt').write_text(''.join(f'{record.name}\n' for record in records))
+        print(f'Aligned {aligned} pairs into {args.output}', file=sys.stderr)
+    elif args.batch:
+        from batch import read_manifest, run_batch
+
+        output = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            run_batch(
+                read_manifest(args.batch), output, args.workers, args.in_flight, args.ordered,
+                args.cache, cache_bytes
+            )
+        finally:
+            if args.output:
+                output.close()
+    elif args.local:
+        from local import local_align
+
+        if args.seq2_file is None:
+            parser.error('--local needs seq1_file and seq2_file')
+        result = local_align(
+            _content_or_string(args.seq1_file), _content_or_string(args.seq2_file), banded_width=args.banded_width
+        )
+        print(f'Score: {result.cost}')
+        print(f'seq1[{result.start1}:{result.end1}] seq2[{result.start2}:{result.end2}]')
+        print(result.alignment1)
+        print(result.alignment2)
+    elif args.window:
+        from windows import PROFILE_BAND, window_profile
+
+        if args.seq2_file is None:
+            parser.error('--window needs seq1_file and seq2_file')
+        if args.banded_width == 'auto':
+            parser.error("--window needs a numeric --banded-width")
+        profile = window_profile(
+            _content_or_string(args.seq1_file), _content_or_string(args.seq2_file), args.window, args.stride,
+            band=PROFILE_BAND if args.banded_width == -1 else args.banded_width
+        )
+        for window in profile:
+            print(json.dumps(window._asdict()))
+    else:
+        if args.seq2_file is None:
+            parser.error('seq1_file and seq2_file are required without --batch')
 
-    seq1 = _content_or_string(args.seq1_file)
-    seq2 = _content_or_string(args.seq2_file)
+        input_started = time.perf_counter()
+        seq1 = _content_or_string(args.seq1_file)
+        seq2 = _content_or_string(args.seq2_file)
+        stats = {'input_seconds': time.perf_counter() - input_started} if args.stats else None
 
-    main(seq1, seq2)
+        main(seq1, seq2, args.cache, cache_bytes, args.cigar, stats, args.banded_width)
@@ -0,0 +1,186 @@
+import mmap
+import re
+import struct
+import sys
+from argparse import ArgumentParser
+from array import array
+from bisect import bisect_right
+
+# First bytes of every packed sequence file
+PACKED_MAGIC = b'NWPK'
+
+# Bumped whenever the layout below changes; readers refuse other versions
+PACKED_VERSION = 1
+
+# magic, version, sequence length, lowercase runs, exception runs, name length
+_HEADER = struct.Struct('<4sB3xQQQI')
+
+# Base -> 2-bit code; anything else is packed as A and restored from the exception runs
+_CODES = bytes(b'ACGT'.find(bytes([byte]).upper()) % 4 for byte in range(256))
+
+# Packed byte -> its four bases, first base in the high bits
+_QUADS = [
+    bytes(b'ACGT'[byte >> shift & 3] for shift in (6, 4, 2, 0))
+    for byte in range(256)
+]
+
+_LOWERCASE_RUN = re.compile(rb'[a-z]+')
+_EXCEPTION_RUN = re.compile(rb'([^ACGTacgt])\1*')
+
+
+def pack_sequence(sequence: bytes, path, name: str | None = None):
+    """
+    Write sequence to path in the packed format: two bits per base, plus runs of lowercase bases
+    and runs of anything other than ACGT (N and the other ambiguity codes), so it reads back byte for byte.
+    """
+    lowercase = [(run.start(), run.end() - run.start()) for run in _LOWERCASE_RUN.finditer(sequence)]
+    exceptions = [(run.start(), run.end() - run.start(), run[0][:1]) for run in _EXCEPTION_RUN.finditer(sequence)]
+    encoded_name = (name or '').encode()
+
+    codes = sequence.translate(_CODES) + b'\0' * (-len(sequence) % 4)
+    packed = bytes(
+        a << 6 | b << 4 | c << 2 | d
+        for a, b, c, d in zip(codes[0::4], codes[1::4], codes[2::4], codes[3::4])
+    )
+
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(
+            PACKED_MAGIC, PACKED_VERSION, len(sequence), len(lowercase), len(exceptions), len(encoded_name)
+        ))
+        file.write(encoded_name)
+        for runs in (lowercase, exceptions):
+            file.write(_pack_runs([start for start, *_ in runs]))
+            file.write(_pack_runs([length for _, length, *_ in runs]))
+        file.write(b''.join(base for *_, base in exceptions))
+        file.write(packed)
+
+
+def pack_file(source, path, index: int = 0) -> int:
+    """
+    Convert the index-th record of a FASTA or plain sequence file to a packed file at path
+    :return: the number of bases packed
+    """
+    from sequences import read_records
+
+    for position, record in enumerate(read_records(source)):
+        if position == index:
+            pack_sequence(record.sequence, path, record.name)
+            return len(record.sequence)
+    raise IndexError(f'{source} has no sequence {index}')
+
+
+class PackedSequence:
+    """
+    A packed sequence file, memory-mapped: a quarter of a byte per base, read only where sliced.
+    seq[i] and seq[start:stop] decode just the bases asked for, as a str ready for align().
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.length, lowercase, exceptions, name_length = _HEADER.unpack_from(self._data)
+        if magic != PACKED_MAGIC or version != PACKED_VERSION:
+            raise ValueError(f'{path} is not a version {PACKED_VERSION} packed sequence file')
+
+        offset = _HEADER.size
+        self.name = self._data[offset:offset + name_length].decode() or None
+        offset += name_length
+
+        # The runs are few next to the bases, so they are read into memory; the bases stay in the map
+        self._lowercase_starts, offset = _unpack_runs(self._data, offset, lowercase)
+        self._lowercase_ends, offset = _unpack_runs(self._data, offset, lowercase)
+        self._exception_starts, offset = _unpack_runs(self._data, offset, exceptions)
+        self._exception_ends, offset = _unpack_runs(self._data, offset, exceptions)
+        self._exception_bases = self._data[offset:offset + exceptions]
+        self._offset = offset + exceptions
+
+        for starts, ends in ((self._lowercase_starts, self._lowercase_ends),
+                             (self._exception_starts, self._exception_ends)):
+            for run, start in enumerate(starts):
+                ends[run] += start
+
+    def fetch(self, start: int = 0, stop: int | None = None) -> bytes:
+        """
+        The bases in [start, stop) as bytes, exactly as they were in the source file
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if start >= stop:
+            return b''
+
+        first = start // 4
+        packed = self._data[self._offset + first:self._offset + (stop + 3) // 4]
+        bases = bytearray(b''.join(map(_QUADS.__getitem__, packed)))
+        del bases[:start - 4 * first]
+        del bases[stop - start:]
+
+        for run in range(bisect_right(self._lowercase_ends, start), len(self._lowercase_starts)):
+            run_start = self._lowercase_starts[run]
+            if run_start >= stop:
+                break
+            low = max(run_start, start) - start
+            high = min(self._lowercase_ends[run], stop) - start
+            bases[low:high] = bases[low:high].lower()
+
+        for run in range(bisect_right(self._exception_ends, start), len(self._exception_starts)):
+            run_start = self._exception_starts[run]
+            if run_start >= stop:
+                break
+            low = max(run_start, start) - start
+            high = min(self._exception_ends[run], stop) - start
+            bases[low:high] = self._exception_bases[run:run + 1] * (high - low)
+
+        return bytes(bases)
+
+    def __getitem__(self, index) -> str:
+        if isinstance(index, slice):
+            if index.step not in (None, 1):
+                return self[index.start:index.stop][::index.step]
+            return self.fetch(index.start, index.stop).decode('latin-1')
+
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('packed sequence index out of range')
+        return self.fetch(index, index + 1).decode('latin-1')
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return self[:]
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pack_runs(values: list[int]) -> bytes:
+    runs = array('Q', values)
+    if sys.byteorder == 'big':
+        runs.byteswap()
+    return runs.tobytes()
+
+
+def _unpack_runs(data, offset: int, count: int) -> tuple[array, int]:
+    runs = array('Q')
+    runs.frombytes(data[offset:offset + 8 * count])
+    if sys.byteorder == 'big':
+        runs.byteswap()
+    return runs, offset + 8 * count
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Convert a FASTA or plain sequence file to the packed 2-bit format')
+    parser.add_argument('source', help='FASTA or plain sequence file')
+    parser.add_argument('destination', help='Packed file to write')
+    parser.add_argument('--index', type=int, default=0, help='Which record of a FASTA file to pack')
+    args = parser.parse_args()
+
+    bases = pack_file(args.source, args.destination, args.index)
+    print(f'Packed {bases} bases into {args.destination}', file=sys.stderr)
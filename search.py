@@ -0,0 +1,121 @@
+import sqlite3
+from pathlib import Path
+from typing import NamedTuple
+
+from alignment import align, reaching_band
+from sequences import read_records
+
+# k-mer length of a new database's index
+SEARCH_KMER = 12
+
+# How many of the best k-mer matches are aligned for each query by default
+SEARCH_CANDIDATES = 50
+
+
+class Hit(NamedTuple):
+    """
+    One search result: the stored sequence's name, its alignment cost against the query,
+    and how many distinct k-mers it shares with the query
+    """
+    name: str
+    cost: float
+    shared_kmers: int
+
+
+class SequenceDatabase:
+    """
+    Stored sequences plus an inverted index from each k-mer to the sequences containing it, in one SQLite file.
+    search() ranks the stored sequences by shared k-mers using the index alone and runs align() only on
+    the best few, so a query costs a handful of alignments however many sequences are stored.
+    """
+
+    def __init__(self, path, kmer: int = SEARCH_KMER):
+        """
+        :param path: the database file; created if missing
+        :param kmer: k-mer length for a new database; an existing one keeps the length it was built with
+        """
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS sequences (id INTEGER PRIMARY KEY, name TEXT NOT NULL, sequence TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS kmers (kmer TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (kmer, id)) '
+            'WITHOUT ROWID;'
+        )
+        with self._db:
+            self._db.execute("INSERT OR IGNORE INTO meta VALUES ('kmer', ?)", (str(kmer),))
+        self.kmer = int(self._db.execute("SELECT value FROM meta WHERE key = 'kmer'").fetchone()[0])
+
+    def add(self, name: str, sequence: str) -> int:
+        """
+        Store one sequence and index its k-mers
+        :return: its id
+        """
+        with self._db:
+            cursor = self._db.execute('INSERT INTO sequences (name, sequence) VALUES (?, ?)', (name, sequence))
+            sequence_id = cursor.lastrowid
+            self._db.executemany(
+                'INSERT OR IGNORE INTO kmers VALUES (?, ?)',
+                ((word, sequence_id) for word in _kmers(sequence, self.kmer))
+            )
+        return sequence_id
+
+    def add_file(self, path) -> int:
+        """
+        Store every record of a FASTA or plain sequence file; a record without a header is named after the file
+        :return: how many sequences were added
+        """
+        added = 0
+        for record in read_records(path):
+            self.add(record.name or Path(path).stem, record.sequence.decode('latin-1'))
+            added += 1
+        return added
+
+    def candidates(self, query: str, limit: int = SEARCH_CANDIDATES) -> list[tuple[int, int]]:
+        """
+        The stored sequences sharing the most distinct k-mers with query, best first
+        :return: (id, shared k-mer count) pairs
+        """
+        self._db.execute('CREATE TEMP TABLE IF NOT EXISTS query (kmer TEXT PRIMARY KEY) WITHOUT ROWID')
+        with self._db:
+            self._db.execute('DELETE FROM query')
+            self._db.executemany('INSERT OR IGNORE INTO query VALUES (?)', ((word,) for word in _kmers(query, self.kmer)))
+        return self._db.execute(
+            'SELECT id, COUNT(*) AS shared FROM query JOIN kmers USING (kmer) '
+            'GROUP BY id ORDER BY shared DESC, id LIMIT ?',
+            (limit,)
+        ).fetchall()
+
+    def search(self, query: str, top: int = 5, candidates: int = SEARCH_CANDIDATES, **align_options) -> list[Hit]:
+        """
+        The top stored sequences closest to query: the best `candidates` by shared k-mers, aligned score-only
+        and ranked by cost. Sequences sharing no k-mer with the query are never aligned.
+        :param align_options: passed on to align(), e.g. banded_width='auto' or the penalties;
+            a numeric banded_width is widened for each candidate to at least its length difference from query
+        """
+        hits = []
+        for sequence_id, shared in self.candidates(query, max(top, candidates)):
+            name, sequence = self._db.execute(
+                'SELECT name, sequence FROM sequences WHERE id = ?', (sequence_id,)
+            ).fetchone()
+            banded_width = reaching_band(align_options.get('banded_width', -1), query, sequence)
+            cost, _, _ = align(query, sequence, traceback=False, **{**align_options, 'banded_width': banded_width})
+            hits.append(Hit(name, cost, shared))
+
+        hits.sort(key=lambda hit: (hit.cost, -hit.shared_kmers))
+        return hits[:top]
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM sequences').fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _kmers(sequence: str, kmer: int) -> set[str]:
+    return {sequence[i:i + kmer] for i in range(len(sequence) - kmer + 1)}
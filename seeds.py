@@ -0,0 +1,173 @@
+import time
+from bisect import bisect_left
+
+from alignment import align, auto_band_edit, banded_edit, diff, find_path, linear_space_path
+
+# Length of the exact matches used as anchors
+SEED_KMER = 16
+
+
+def seed_align(penalties: dict, gap: str, x: str, y: str, banded_width=-1, kmer: int = SEED_KMER) -> tuple[int, str, str]:
+    """
+    Seed-and-extend alignment: anchor x to y on a collinear chain of k-mers that occur exactly once in each,
+    keep the anchors as runs of matches, and run the DP only on the stretches between them.
+    The result is a valid global alignment and its true cost, but not necessarily the optimal one;
+    see seed_report() for how far off it is.
+    """
+    pieces1 = []
+    pieces2 = []
+    cost = 0
+    x_end = 0
+    y_end = 0
+
+    for i, j, length in anchors(x, y, kmer) + [(len(x), len(y), 0)]:
+        piece_cost, piece1, piece2 = _align_piece(penalties, gap, x[x_end:i], y[y_end:j], banded_width)
+        cost += piece_cost
+        pieces1.append(piece1)
+        pieces2.append(piece2)
+
+        matched = x[i:i + length]
+        cost += sum(diff(penalties, char, char) for char in matched)
+        pieces1.append(matched)
+        pieces2.append(matched)
+
+        x_end = i + length
+        y_end = j + length
+
+    return cost, ''.join(pieces1), ''.join(pieces2)
+
+
+def anchors(x: str, y: str, kmer: int = SEED_KMER) -> list[tuple[int, int, int]]:
+    """
+    Exact matches (i, j, length), x[i:i + length] == y[j:j + length], increasing and non-overlapping in both sequences.
+    Built from k-mers unique to both sequences: the longest chain that increases in both, found with
+    patience sorting, then runs on one diagonal merged and overlaps trimmed.
+    """
+    index = _unique_kmers(y, kmer)
+    hits = [
+        (i, index[word])
+        for word, i in _unique_kmers(x, kmer).items()
+        if word in index
+    ]
+    hits.sort()
+
+    chain = []
+    for i, j, length in _merge_runs(_longest_chain(hits), kmer):
+        if chain:
+            last_i, last_j, last_length = chain[-1]
+            overlap = max(last_i + last_length - i, last_j + last_length - j, 0)
+            i += overlap
+            j += overlap
+            length -= overlap
+        if length > 0:
+            chain.append((i, j, length))
+
+    return chain
+
+
+def seed_report(
+        seq1: str,
+        seq2: str,
+        match_award=-3,
+        indel_penalty=5,
+        sub_penalty=1,
+        banded_width=-1,
+        kmer: int = SEED_KMER
+) -> dict:
+    """
+    Run the seeded alignment and the exact one side by side to judge the trade-off.
+    The exact cost comes from align(..., banded_width='auto', traceback=False), which is provably optimal.
+    :return: both costs, how much worse the seeded cost is, how much of seq1 the anchors cover, and both timings
+    """
+    start = time.perf_counter()
+    seeded, _, _ = align(
+        seq1, seq2, match_award, indel_penalty, sub_penalty, banded_width, engine='seed', seed_kmer=kmer
+    )
+    seeded_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact, _, _ = align(seq1, seq2, match_award, indel_penalty, sub_penalty, banded_width='auto', traceback=False)
+    exact_seconds = time.perf_counter() - start
+
+    chain = anchors(seq1, seq2, kmer)
+    return {
+        'seeded_cost': seeded,
+        'exact_cost': exact,
+        'excess': seeded - exact,
+        'anchors': len(chain),
+        'anchored_fraction': sum(length for _, _, length in chain) / len(seq1) if seq1 else 0.0,
+        'seeded_seconds': seeded_seconds,
+        'exact_seconds': exact_seconds
+    }
+
+
+def _unique_kmers(seq: str, kmer: int) -> dict:
+    """
+    k-mer -> its start position, for the k-mers that occur exactly once in seq
+    """
+    positions = {}
+    repeated = set()
+    for i in range(len(seq) - kmer + 1):
+        word = seq[i:i + kmer]
+        if word in positions:
+            repeated.add(word)
+        else:
+            positions[word] = i
+    for word in repeated:
+        del positions[word]
+    return positions
+
+
+def _longest_chain(hits: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    The longest subsequence of hits (sorted by i, all i distinct) whose j strictly increases
+    """
+    tails = []
+    tail_index = []
+    previous = [-1] * len(hits)
+
+    for index, (_, j) in enumerate(hits):
+        position = bisect_left(tails, j)
+        if position > 0:
+            previous[index] = tail_index[position - 1]
+        if position == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[position] = j
+            tail_index[position] = index
+
+    chain = []
+    index = tail_index[-1] if tail_index else -1
+    while index != -1:
+        chain.append(hits[index])
+        index = previous[index]
+    return chain[::-1]
+
+
+def _merge_runs(chain: list[tuple[int, int]], kmer: int):
+    """
+    Merge consecutive hits on the same diagonal that overlap or touch into single matches
+    """
+    run = None
+    for i, j in chain:
+        if run and j - i == run[1] - run[0] and i <= run[0] + run[2]:
+            run[2] = i + kmer - run[0]
+        else:
+            if run:
+                yield tuple(run)
+            run = [i, j, kmer]
+    if run:
+        yield tuple(run)
+
+
+def _align_piece(penalties: dict, gap: str, x: str, y: str, banded_width) -> tuple[int, str, str]:
+    """
+    Align one stretch between anchors with the requested band, or the linear-space engine when there is none
+    (or the stretch's length difference does not fit it)
+    """
+    if banded_width == 'auto':
+        return find_path(penalties, gap, auto_band_edit(penalties, x, y), x, y)
+    if banded_width != -1 and abs(len(x) - len(y)) <= banded_width:
+        return find_path(penalties, gap, banded_edit(penalties, x, y, banded_width), x, y)
+    return linear_space_path(penalties, gap, x, y)
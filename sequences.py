@@ -0,0 +1,69 @@
+import mmap
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from packed import PACKED_MAGIC, PackedSequence
+
+# Bytes dropped from sequence lines: line breaks and stray spacing
+_WHITESPACE = b' \t\r\n\v\f'
+
+
+class Record(NamedTuple):
+    """
+    One sequence from a file: its FASTA header (without the '>'), or None for a plain sequence file,
+    and the sequence with its line breaks removed
+    """
+    name: str | None
+    sequence: bytes
+
+
+def read_records(path) -> Iterator[Record]:
+    """
+    Lazily yield the records of a FASTA file, or the single sequence of a plain text or packed file.
+    The file is memory-mapped rather than read, and each record is copied out of the map only when it is reached,
+    so a multi-genome file never sits in memory as a whole.
+    Sequences come back as bytes; slice them before decoding to align just a region.
+    """
+    with open(path, 'rb') as file:
+        if Path(path).stat().st_size == 0:
+            yield Record(None, b'')
+            return
+
+        if file.read(len(PACKED_MAGIC)) == PACKED_MAGIC:
+            with PackedSequence(path) as packed:
+                yield Record(packed.name, packed.fetch())
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = _skip_whitespace(data, 0)
+            if start == len(data) or data[start:start + 1] != b'>':
+                yield Record(None, data[:].translate(None, _WHITESPACE))
+                return
+
+            while start != -1:
+                end = data.find(b'\n>', start)
+                header_end = data.find(b'\n', start)
+                if header_end == -1:
+                    header_end = len(data)
+
+                name = data[start + 1:header_end].decode('latin-1').strip()
+                body = data[header_end:len(data) if end == -1 else end]
+                yield Record(name, body.translate(None, _WHITESPACE))
+
+                start = -1 if end == -1 else end + 1
+
+
+def read_sequence(path, index: int = 0) -> str:
+    """
+    The index-th sequence of a FASTA, plain or packed sequence file as a str, ready for align()
+    """
+    for position, record in enumerate(read_records(path)):
+        if position == index:
+            return record.sequence.decode('latin-1')
+    raise IndexError(f'{path} has no sequence {index}')
+
+
+def _skip_whitespace(data, position: int) -> int:
+    while position < len(data) and data[position] in _WHITESPACE:
+        position += 1
+    return position
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from alignment import align
+from cache import cache_key
+
+# Pairs with more DP cells than this go to the large lane, so they never hold up the small ones
+SMALL_CELLS = 4_000_000
+
+# Requests each lane may hold waiting for a worker before new ones are turned away with a 429
+SERVICE_QUEUE_SIZE = 256
+
+# Completed requests kept for the latency percentiles
+LATENCY_WINDOW = 1000
+
+# Request fields passed on to align()
+SERVICE_OPTIONS = (
+    'match_award', 'indel_penalty', 'sub_penalty', 'banded_width', 'gap', 'traceback', 'engine', 'max_cost',
+    'memory_budget'
+)
+
+
+class QueueFull(Exception):
+    """
+    The request's lane already holds as many waiting requests as it may
+    """
+
+
+class AlignmentService:
+    """
+    align() behind an asyncio front end, for serving many clients from one process pool per lane.
+    Requests are split by size into a small and a large lane, each with its own bounded queue and its own workers,
+    so a queue of 31 kb pairs cannot delay a 100 bp one. A request identical to one already queued or running
+    (same cache_key()) waits for that one's result instead of being aligned again. When a lane's queue is
+    full, new requests for it are rejected at once rather than piling up.
+    """
+
+    def __init__(
+            self,
+            workers: int | None = None,
+            large_workers: int | None = None,
+            queue_size: int = SERVICE_QUEUE_SIZE,
+            small_cells: int = SMALL_CELLS
+    ):
+        """
+        :param workers: processes for the small lane; defaults to one per CPU
+        :param large_workers: processes for the large lane; defaults to a quarter of workers, at least one
+        :param queue_size: how many requests each lane may hold waiting
+        :param small_cells: the largest (len(seq1) + 1) * (len(seq2) + 1) that still counts as small
+        """
+        workers = workers or os.cpu_count() or 1
+        self.small_cells = small_cells
+        self._lanes = {
+            'small': _Lane(workers, queue_size),
+            'large': _Lane(large_workers or max(1, workers // 4), queue_size)
+        }
+        self._in_flight = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counts = {'completed': 0, 'coalesced': 0, 'rejected': 0, 'failed': 0}
+        self._consumers = []
+
+    async def start(self):
+        """
+        Start the lanes' dispatchers; must be called from the event loop that will serve the requests
+        """
+        for lane in self._lanes.values():
+            self._consumers += [asyncio.create_task(lane.consume()) for _ in range(lane.workers)]
+
+    async def close(self):
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        for lane in self._lanes.values():
+            lane.pool.shutdown(cancel_futures=True)
+
+    def enqueue(self, seq1: str, seq2: str, **options) -> asyncio.Future:
+        """
+        Queue align(seq1, seq2, **options), or join an identical request already in flight
+        :return: a future for the (cost, alignment1, alignment2) result
+        :raise QueueFull: if the request's lane is full
+        """
+        key = cache_key(seq1, seq2, **options)
+        if key in self._in_flight:
+            self._counts['coalesced'] += 1
+            return self._in_flight[key]
+
+        lane = self._lanes['small' if (len(seq1) + 1) * (len(seq2) + 1) <= self.small_cells else 'large']
+        future = asyncio.get_running_loop().create_future()
+        try:
+            lane.queue.put_nowait((seq1, seq2, options, future))
+        except asyncio.QueueFull:
+            self._counts['rejected'] += 1
+            raise QueueFull from None
+
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return future
+
+    async def handle(self, request) -> dict:
+        """
+        Answer one decoded JSON request: {"seq1", "seq2", options...} to align, or {"op": "stats"}.
+        The reply carries the request's id and an HTTP-style status: 200, 400 for a bad request, 429 when full.
+        """
+        if not isinstance(request, dict):
+            return {'id': None, 'status': 400, 'error': 'a request must be a JSON object'}
+
+        reply = {'id': request.get('id')}
+        if request.get('op') == 'stats':
+            return {**reply, 'status': 200, **self.stats()}
+
+        started = time.perf_counter()
+        try:
+            options = {key: request[key] for key in SERVICE_OPTIONS if key in request}
+            cost, alignment1, alignment2 = await self.enqueue(request['seq1'], request['seq2'], **options)
+        except QueueFull:
+            return {**reply, 'status': 429, 'error': 'queue full, retry later'}
+        except Exception as error:
+            self._counts['failed'] += 1
+            return {**reply, 'status': 400, 'error': f'{type(error).__name__}: {error}'}
+
+        seconds = time.perf_counter() - started
+        self._latencies.append(seconds)
+        self._counts['completed'] += 1
+        return {**reply, 'status': 200, 'score': cost, 'alignment1': alignment1, 'alignment2': alignment2,
+                'seconds': seconds}
+
+    def stats(self) -> dict:
+        """
+        Queue depths, request counts and latency percentiles over the last LATENCY_WINDOW requests
+        """
+        latencies = sorted(self._latencies)
+        return {
+            'queued': {name: lane.queue.qsize() for name, lane in self._lanes.items()},
+            'running': {name: lane.running for name, lane in self._lanes.items()},
+            'in_flight': len(self._in_flight),
+            **self._counts,
+            'latency_seconds': {
+                f'p{percent}': latencies[min(len(latencies) - 1, len(latencies) * percent // 100)] if latencies else None
+                for percent in (50, 90, 99)
+            }
+        }
+
+    async def serve(self, path: str):
+        """
+        Serve line-delimited JSON on a Unix socket until cancelled: one request per line,
+        one reply per line, replies in completion order (match them up by id)
+        """
+        await self.start()
+        server = await asyncio.start_unix_server(self._connection, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        replies = set()
+
+        async def answer(line: bytes):
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                reply = {'id': None, 'status': 400, 'error': f'bad JSON: {error}'}
+            else:
+                reply = await self.handle(request)
+            writer.write(json.dumps(reply).encode() + b'\n')
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(answer(line))
+                    replies.add(task)
+                    task.add_done_callback(replies.discard)
+            await asyncio.gather(*replies)
+        finally:
+            writer.close()
+
+
+class _Lane:
+    """
+    One size class of requests: a bounded queue drained by `workers` dispatchers into a pool of as many processes
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue = asyncio.Queue(queue_size)
+        self.pool = ProcessPoolExecutor(workers)
+        self.running = 0
+
+    async def consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            seq1, seq2, options, future = await self.queue.get()
+            self.running += 1
+            try:
+                result = await loop.run_in_executor(self.pool, _align_request, seq1, seq2, options)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+
+
+def _align_request(seq1: str, seq2: str, options: dict):
+    return align(seq1, seq2, **options)
@@ -1,5 +1,6 @@
 from pathlib import Path
 
+import pytest
 from byu_pytest_utils import with_import, max_score, test_files
 
 from test_utils import timeout
@@ -119,3 +120,513 @@ def test_massive_dna_alignment_banded(align):
     assert score == -17380
     assert aseq1 == expected_align1
     assert aseq2 == expected_align2
+
+
+@with_import('alignment')
+def test_edit_matrix_rows(edit):
+    penalties = {'match': -3, 'indel': 5, 'sub': 1}
+    matrix = edit(penalties, 'ATGCATGC', 'ATGGTGC')
+    assert matrix[8, 7] == -12
+    assert list(matrix.row(0)) == [0, 5, 10, 15, 20, 25, 30, 35]
+    assert [matrix[i, 0] for i in range(9)] == [i * 5 for i in range(9)]
+
+
+@with_import('alignment')
+def test_banded_edit_band_storage(banded_edit):
+    penalties = {'match': -3, 'indel': 5, 'sub': 1}
+    matrix = banded_edit(penalties, 'ATGCATGC', 'ATGGTGC', 2)
+    assert matrix[8, 7] == -12
+    assert matrix[0, 5] == float('inf')
+    assert matrix[6, 1] == float('inf')
+    assert len(matrix.row(4)) == 5
+    assert len(matrix.cells) == 9 * 6
+
+
+@with_import('alignment')
+@timeout(20)
+def test_score_only_alignment(align):
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:31000]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:31000]
+
+    assert align(seq1, seq2, banded_width=3, traceback=False) == (-17380, None, None)
+    assert align(seq1[:300], seq2[:200], traceback=False)[0] == align(seq1[:300], seq2[:200])[0]
+
+
+@with_import('alignment')
+@timeout(180)
+def test_large_dna_alignment_linear_space(align):
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:3000]
+
+    score, aseq1, aseq2 = align(seq1, seq2, engine='linear')
+
+    assert score == -3666
+    assert aseq1 == (test_files / 'large_bovine_murine_align1.txt').read_text()
+    assert aseq2 == (test_files / 'large_bovine_murine_align2.txt').read_text()
+
+
+@with_import('alignment')
+@timeout(20)
+def test_large_dna_alignment_numpy(align):
+    pytest.importorskip('numpy')
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:3000]
+
+    score, aseq1, aseq2 = align(seq1, seq2, engine='numpy')
+
+    assert score == -3666
+    assert aseq1 == (test_files / 'large_bovine_murine_align1.txt').read_text()
+    assert aseq2 == (test_files / 'large_bovine_murine_align2.txt').read_text()
+
+
+@with_import('alignment')
+@timeout(60)
+def test_large_dna_alignment_tiled(align):
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:3000]
+
+    score, aseq1, aseq2 = align(seq1, seq2, engine='tiled', workers=2)
+
+    assert score == -3666
+    assert aseq1 == (test_files / 'large_bovine_murine_align1.txt').read_text()
+    assert aseq2 == (test_files / 'large_bovine_murine_align2.txt').read_text()
+
+    # Paths that cross many tile edges still break ties the way find_path() does
+    from alignment import edit, find_path
+    from tiled import tiled_path
+    penalties = {'match': -3, 'indel': 5, 'sub': 1, 'costs': None}
+    for x, y in (('ATATATATAT', 'TATATATATA'), ('GGGGTTTTAAAACCCCTTTT', 'TTTTAAAACCCCTTTTGGGG'), ('ACGT', '')):
+        assert tiled_path(penalties, '-', x, y, workers=2, tile=3) == find_path(penalties, '-', edit(penalties, x, y), x, y)
+
+
+@with_import('alignment')
+def test_find_path_walks_recorded_moves(find_path):
+    from alignment import edit, banded_edit
+
+    penalties = {'match': -3, 'indel': 5, 'sub': 1}
+    for matrix in (edit(penalties, 'ATATATATAT', 'TATATATATA'), banded_edit(penalties, 'ATATATATAT', 'TATATATATA', 2)):
+        assert len(matrix.moves) <= len(matrix.cells)
+        # Only the end cell's score should be read
+        end = matrix[10, 10]
+        for index in range(len(matrix.cells)):
+            matrix.cells[index] = 0
+        matrix[10, 10] = end
+        score, aseq1, aseq2 = find_path(penalties, '-', matrix, 'ATATATATAT', 'TATATATATA')
+        assert score == -17
+        assert aseq1 == 'ATATATATAT-'
+        assert aseq2 == '-TATATATATA'
+
+
+@with_import('alignment')
+def test_cost_table_alignment(align):
+    from alignment import CostTable
+
+    seq1 = 'ataagagtgattggcgatatcggctccgtacgtaccctttctactctcgggctcttccccgttag'
+    seq2 = 'ataagagtgattggcgtccgtacgtaccctttctactctcaaactcttgttagtttaaat'
+
+    classic = CostTable.match_sub('acgt', -3, 1)
+    assert align(seq1, seq2, costs=classic) == align(seq1, seq2)
+
+    dna = CostTable.transition_transversion(-3, 1, 2, alphabet='ACGTacgt')
+    assert align('CAGT', 'CGGA', costs=dna) == (-3, 'CAGT', 'CGGA')
+    for engine in ('linear', 'numpy'):
+        if engine == 'numpy':
+            pytest.importorskip('numpy')
+        assert align(seq1, seq2, costs=dna, engine=engine) == align(seq1, seq2, costs=dna)
+
+    # An asymmetric table gives the same cost score-only, whichever sequence the rows run over
+    skewed = CostTable('AC', [[0, -10], [5, 0]])
+    for pair in (('A', 'CC'), ('AC', 'CCA'), ('CCA', 'AC')):
+        assert align(*pair, costs=skewed, traceback=False)[0] == align(*pair, costs=skewed)[0]
+
+
+@with_import('alignment')
+def test_small_dna_alignment_auto_band(align):
+    score, aseq1, aseq2 = align('GGGGTTTTAAAACCCCTTTT', 'TTTTAAAACCCCTTTTGGGG', banded_width='auto')
+    assert score == -8
+    assert aseq1 == 'GGGGTTTTAAAACCCCTTTT----'
+    assert aseq2 == '----TTTTAAAACCCCTTTTGGGG'
+
+    # A length difference wider than any fixed band still works
+    assert align('ATGCATGCATGCATGCATGC', 'ATGC', banded_width='auto') == align('ATGCATGCATGCATGCATGC', 'ATGC')
+
+
+@with_import('alignment')
+@timeout(20)
+def test_seeded_alignment(align):
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    seq2 = ''.join('a' if i % 250 == 0 else char for i, char in enumerate(seq1[:1500] + seq1[1520:]))
+
+    score, aseq1, aseq2 = align(seq1, seq2, engine='seed')
+
+    assert aseq1.replace('-', '') == seq1
+    assert aseq2.replace('-', '') == seq2
+    assert score == align(seq1, seq2, banded_width='auto', traceback=False)[0]
+
+    # The band is per piece, so it need not cover the whole pair's length difference
+    score, aseq1, aseq2 = align(seq1, seq2, banded_width=4, engine='seed')
+    assert aseq1.replace('-', '') == seq1
+    assert aseq2.replace('-', '') == seq2
+
+
+@with_import('batch')
+def test_batch_alignment_streams_json_lines(run_batch, tmp_path):
+    import io
+    import json
+    from alignment import align
+    from batch import read_manifest
+
+    pairs = [
+        {'id': 'plain', 'seq1': 'ACGTTGA', 'seq2': 'AGTTCGA'},
+        {'id': 'banded', 'seq1': 'ATATATATAT', 'seq2': 'TATATATATA', 'banded_width': 2},
+        {'id': 'bad', 'seq1': 'AAAA', 'seq2': 'A', 'banded_width': 1},
+    ]
+    output = io.StringIO()
+    assert run_batch(pairs, output, workers=2, in_flight=1, ordered=True) == 3
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result['id'] for result in results] == ['plain', 'banded', 'bad']
+    assert results[0]['score'] == -9
+    assert results[1]['alignment1'] == 'ATATATATAT-'
+    assert 'ValueError' in results[2]['error']
+    assert all(result['seconds'] >= 0 for result in results)
+
+    # Inline sequences longer than a file name can be are not mistaken for paths
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:320]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:320]
+    output = io.StringIO()
+    assert run_batch([{'id': 'long', 'seq1': seq1, 'seq2': seq2}], output, workers=1) == 1
+    result = json.loads(output.getvalue())
+    assert 'error' not in result
+    assert result['score'] == align(seq1, seq2)[0]
+
+    # TSV cells come back as the option's type
+    manifest = tmp_path / 'pairs.tsv'
+    manifest.write_text('id\tseq1\tseq2\tengine\tmemory_budget\tbanded_width\n'
+                        'auto\tACGTTGA\tAGTTCGA\tauto\t1048576\t\n'
+                        'auto-band\tATATATATAT\tTATATATATA\tauto\t1048576\t2\n')
+    output = io.StringIO()
+    assert run_batch(read_manifest(manifest), output, workers=1, ordered=True) == 2
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result.get('error') for result in results] == [None, None]
+    assert results[0]['score'] == -9
+    assert results[1]['alignment1'] == 'ATATATATAT-'
+
+
+@with_import('sequences')
+def test_read_records_strips_line_breaks(read_records, tmp_path):
+    from sequences import read_sequence
+
+    fasta = tmp_path / 'pair.fa'
+    fasta.write_bytes(b'>first genome\nACGT\nAC\r\n\n>second\nGG\nTT')
+    assert [tuple(record) for record in read_records(fasta)] == [('first genome', b'ACGTAC'), ('second', b'GGTT')]
+    assert read_sequence(fasta, 1) == 'GGTT'
+
+    # Plain multi-line files come back as one sequence without newlines
+    bovine = test_files / 'bovine_coronavirus.txt'
+    assert read_sequence(bovine) == ''.join(bovine.read_text().splitlines())
+
+
+@with_import('cache')
+def test_alignment_cache_hits_and_evicts(AlignmentCache, tmp_path):
+    from alignment import align
+
+    with AlignmentCache(tmp_path / 'results.db', memory_entries=1) as results:
+        assert results.align('ACGTTGA', 'AGTTCGA') == align('ACGTTGA', 'AGTTCGA')
+        assert results.align('ACGTTGA', 'AGTTCGA', engine='linear') == align('ACGTTGA', 'AGTTCGA')
+        assert results.align('ACGTTGA', 'AGTTCGA', banded_width=1) == align('ACGTTGA', 'AGTTCGA', banded_width=1)
+        assert (results.hits, results.misses) == (1, 2)
+        # compact results are stored as the tuple and come back as an Alignment, from the cache or not
+        compact = results.align('ACGTTGA', 'AGTTCGA', compact=True)
+        assert compact.cigar() == align('ACGTTGA', 'AGTTCGA', compact=True).cigar()
+        assert results.align('ACGTTGAC', 'AGTTCGA', compact=True) == align('ACGTTGAC', 'AGTTCGA')
+        assert (results.hits, results.misses) == (2, 3)
+
+    # A new process starts with an empty LRU but still finds the stored results
+    with AlignmentCache(tmp_path / 'results.db', max_bytes=60) as results:
+        assert results.align('ACGTTGA', 'AGTTCGA', banded_width=1) == align('ACGTTGA', 'AGTTCGA', banded_width=1)
+        assert results.hits == 1
+        results.align('ATATATATAT', 'TATATATATA')
+        assert results.evictions > 0
+        assert results.stats()['bytes'] <= 60
+
+
+@with_import('incremental')
+def test_incremental_alignment_of_growing_prefixes(IncrementalAligner):
+    from alignment import align
+
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:400]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:400]
+
+    aligner = IncrementalAligner(seq1[:100], seq2[:150])
+    for end1, end2 in ((100, 150), (300, 150), (300, 400), (400, 400)):
+        assert aligner.align(seq1[:end1], seq2[:end2]) == align(seq1[:end1], seq2[:end2])
+
+    # Sequences that are not extensions start over
+    assert aligner.align('ACGTTGA', 'AGTTCGA') == align('ACGTTGA', 'AGTTCGA')
+
+
+@with_import('alignment')
+def test_compact_alignment(align):
+    import io
+
+    result = align('polynomial', 'exponential', compact=True)
+    assert result == (-1, 'polyn-omial', 'exponential')
+    score, aseq1, aseq2 = result
+    assert result.cigar() == '5M1D5M'
+    assert result[4:7] == ('n-o', 'nen')
+
+    output = io.StringIO()
+    result.write(output)
+    assert output.getvalue() == 'polyn-omial\nexponential\n'
+
+    for options in ({'banded_width': 3}, {'engine': 'linear'}):
+        assert align('ATGCATGC', 'ATGGTGC', compact=True, **options) == align('ATGCATGC', 'ATGGTGC', **options)
+
+
+@with_import('alignment')
+@timeout(20)
+def test_max_cost_screening(align):
+    seq1 = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    seq2 = read_sequence(test_files / 'murine_hepatitus.txt')[:3000]
+
+    score, aseq1, aseq2 = align(seq1, seq2, max_cost=-3000)
+    assert score == -3666
+    assert aseq1 == (test_files / 'large_bovine_murine_align1.txt').read_text()
+    assert aseq2 == (test_files / 'large_bovine_murine_align2.txt').read_text()
+
+    assert align(seq1, seq2, max_cost=-3667) == (None, None, None)
+    assert align(seq1, seq2, max_cost=-4000, traceback=False) == (None, None, None)
+    assert align('ATGCATGC', 'ATGGTGC', banded_width=3, max_cost=-12) == align('ATGCATGC', 'ATGGTGC', banded_width=3)
+    assert align('ATGCATGC', 'ATGGTGC', max_cost=float('inf')) == align('ATGCATGC', 'ATGGTGC')
+
+    with pytest.raises(ValueError):
+        align(seq1, seq2, engine='linear', max_cost=0)
+
+
+@with_import('benchmark')
+def test_benchmark_flags_regressions(compare):
+    baseline = [
+        {'mode': 'matrix', 'size': 100, 'score': -100, 'seconds': 1.0, 'peak_rss_bytes': 100},
+        {'mode': 'banded-3', 'size': 100, 'score': -90, 'seconds': 1.0, 'peak_rss_bytes': 100},
+    ]
+    results = [
+        {'mode': 'matrix', 'size': 100, 'score': -100, 'seconds': 1.1, 'peak_rss_bytes': 200},
+        {'mode': 'banded-3', 'size': 100, 'score': -91, 'seconds': 2.0, 'peak_rss_bytes': 100},
+        {'mode': 'linear', 'size': 100, 'score': -100, 'seconds': 9.0, 'peak_rss_bytes': 100},
+    ]
+    flagged = {(regression['mode'], regression['metric']) for regression in compare(results, baseline)}
+    assert flagged == {('matrix', 'peak_rss_bytes'), ('banded-3', 'seconds'), ('banded-3', 'score')}
+
+
+@with_import('alignment')
+def test_alignment_stats(align):
+    stats = {}
+    assert align('ATGCATGC', 'ATGGTGC', stats=stats) == (-12, 'ATGCATGC', 'ATG-GTGC')
+    assert stats['cells'] == 8 * 7
+    assert stats['sentinel_reads'] == 0
+    assert stats['path_length'] == 8
+    assert stats['fill_seconds'] + stats['traceback_seconds'] <= stats['total_seconds']
+
+    align('ATGCATGC', 'ATGGTGC', banded_width=1, traceback=False, stats=stats)
+    assert stats['traceback_seconds'] is None
+    assert stats['cells'] == 2 + 3 * 5 + 2 + 1
+    # One read past each edge of the band per row, except where the band touches the matrix border
+    assert stats['sentinel_reads'] == 7 + 6
+
+
+@with_import('distances')
+def test_distance_matrix_resumes(distance_matrix, tmp_path):
+    import math
+    import struct
+    from alignment import align
+    from distances import read_distance_matrix
+
+    sequences = ['ATGCATGC', 'ATGGTGC', 'polynomial', 'exponential', '']
+    path = tmp_path / 'costs.npy'
+    assert distance_matrix(sequences, path, workers=2, chunk=3) == 15
+
+    costs = read_distance_matrix(path)
+    for i, seq1 in enumerate(sequences):
+        for j, seq2 in enumerate(sequences):
+            assert costs[i][j] == align(seq1, seq2, traceback=False)[0]
+
+    # Blank out one pair, as if the run had been interrupted; only that pair is aligned again
+    data = bytearray(path.read_bytes())
+    offset = len(data) - 8 * 25
+    for index in (1, 5):
+        data[offset + 8 * index:offset + 8 * index + 8] = struct.pack('<d', math.nan)
+    path.write_bytes(bytes(data))
+    assert distance_matrix(sequences, path, workers=2) == 1
+    assert read_distance_matrix(path) == costs
+
+    # A band narrower than two sequences' length difference is widened for that pair
+    banded = tmp_path / 'banded.npy'
+    assert distance_matrix(['ACGTACGT', 'ACG', 'AC'], banded, banded_width=2, workers=1) == 6
+    assert read_distance_matrix(banded)[0][2] == align('ACGTACGT', 'AC', banded_width=6, traceback=False)[0]
+
+
+@with_import('search')
+def test_sequence_database_search(SequenceDatabase, tmp_path):
+    from alignment import align
+
+    stored = {
+        'tiny': 'ATGCATGCATGCAGGT',
+        'shifted': 'TTATGCATGCATGCAG',
+        'unrelated': 'CCCCCCCCCCCCCCCC',
+    }
+    with SequenceDatabase(tmp_path / 'genomes.db', kmer=4) as database:
+        for name, sequence in stored.items():
+            database.add(name, sequence)
+
+    # Reopening keeps the sequences and the index's k-mer length
+    with SequenceDatabase(tmp_path / 'genomes.db', kmer=8) as database:
+        assert len(database) == 3
+        assert database.kmer == 4
+
+        query = 'ATGCATGCATGCAG'
+        hits = database.search(query, top=2)
+        assert [hit.name for hit in hits] == ['tiny', 'shifted']
+        assert hits[0].cost == align(query, stored['tiny'], traceback=False)[0]
+        # Sequences sharing no k-mer with the query are never aligned
+        assert [hit.name for hit in database.search(query, top=3)] == ['tiny', 'shifted']
+        # Both stored sequences are 2 longer than the query, so a band of 1 is widened for them
+        banded = database.search(query, top=2, banded_width=1)
+        assert banded[0].cost == align(query, stored['tiny'], banded_width=2, traceback=False)[0]
+
+
+@with_import('service')
+def test_alignment_service_coalesces_and_rejects(AlignmentService):
+    import asyncio
+    from service import QueueFull
+
+    async def scenario():
+        service = AlignmentService(workers=1, large_workers=1, queue_size=1, small_cells=100)
+        await service.start()
+        try:
+            # Nothing has been taken off the queues yet, so each lane holds exactly one waiting request
+            first = service.enqueue('ATGCATGC', 'ATGGTGC')
+            assert service.enqueue('ATGCATGC', 'ATGGTGC') is first
+            with pytest.raises(QueueFull):
+                service.enqueue('ACGT', 'ACT')
+            # More than small_cells cells, so it goes to the other lane
+            large = service.enqueue('polynomial', 'exponential')
+
+            assert await first == (-12, 'ATGCATGC', 'ATG-GTGC')
+            assert await large == (-1, 'polyn-omial', 'exponential')
+
+            reply = await service.handle({'id': 7, 'seq1': 'ACGT', 'seq2': 'ACT'})
+            assert reply['status'] == 200 and reply['id'] == 7 and reply['score'] == -4
+            assert (await service.handle([1]))['status'] == 400
+            stats = await service.handle({'op': 'stats'})
+            assert stats['coalesced'] == 1 and stats['rejected'] == 1 and stats['completed'] == 1
+            assert stats['latency_seconds']['p50'] == reply['seconds']
+        finally:
+            await service.close()
+
+    asyncio.run(scenario())
+
+
+@with_import('alignment')
+def test_auto_engine_plans_within_memory_budget(align):
+    from alignment import plan_alignment
+
+    assert plan_alignment(8, 7)['strategy'] == 'matrix'
+    assert plan_alignment(8, 7, traceback=False)['strategy'] == 'score-only'
+    assert plan_alignment(30000, 30000, banded_width=100)['strategy'] == 'band'
+    assert plan_alignment(30000, 30000)['strategy'] == 'auto-band'
+    assert plan_alignment(30000, 30000, memory_budget=1 << 20)['strategy'] == 'linear'
+    with pytest.raises(MemoryError):
+        plan_alignment(30000, 30000, banded_width=100, memory_budget=1 << 10)
+
+    stats = {}
+    assert align('ATGCATGC', 'ATGGTGC', engine='auto', stats=stats) == (-12, 'ATGCATGC', 'ATG-GTGC')
+    assert stats['plan']['strategy'] == 'matrix'
+
+    # Too big for the whole matrix; the band has to widen past the budget, so it ends in linear space
+    seq1, seq2 = 'ACGT' * 75, 'TTGA' * 75
+    assert align(seq1, seq2, engine='auto', memory_budget=300_000, stats=stats) == align(seq1, seq2)
+    assert stats['plan']['strategy'] == 'auto-band'
+    assert stats['plan']['fallback'] == 'linear'
+
+    with pytest.raises(ValueError):
+        align('ATGC', 'ATGC', memory_budget=1 << 20)
+
+
+@with_import('packed')
+def test_packed_sequence_round_trip(pack_file, tmp_path):
+    from packed import PackedSequence
+    from sequences import read_sequence
+
+    fasta = tmp_path / 'masked.fa'
+    fasta.write_text('>masked genome\nACGTNNNNac\ngtRYnnACGT\nA\n')
+    packed = tmp_path / 'masked.pack'
+    assert pack_file(fasta, packed) == 21
+
+    with PackedSequence(packed) as sequence:
+        assert sequence.name == 'masked genome'
+        assert len(sequence) == 21
+        assert sequence[:] == 'ACGTNNNNacgtRYnnACGTA'
+        assert sequence[3:11] == 'TNNNNacg'
+        assert sequence[-1] == 'A'
+
+    bovine = test_files / 'bovine_coronavirus.txt'
+    pack_file(bovine, tmp_path / 'bovine.pack')
+    assert read_sequence(tmp_path / 'bovine.pack') == read_sequence(bovine)
+    assert (tmp_path / 'bovine.pack').stat().st_size < bovine.stat().st_size / 4 + 100
+
+
+@with_import('windows')
+def test_window_profile(window_profile):
+    from alignment import align
+
+    seq1 = 'ATGCATGCATGCAAGTTACGATCGATCGGGTAC'
+    seq2 = 'ATGGTGCATGCATAGTTACCATCGATCGGTAC'
+    total = align(seq1, seq2)[0]
+    assert [window.cost for window in window_profile(seq1, seq2, len(seq1))] == [total]
+
+    windows = list(window_profile(seq1, seq2, 11))
+    assert [(window.start, window.end) for window in windows] == [(0, 11), (11, 22), (22, 33)]
+    assert sum(window.cost for window in windows) == total
+    assert windows[-1].seq2_end == len(seq2)
+
+    overlapping = list(window_profile(seq1, seq2, 11, 2))
+    assert len(overlapping) == 12
+    assert overlapping[0] == windows[0]
+
+    # A seq1 that does not end on a stride still gets a last window ending at its end, cut short
+    windows = list(window_profile(seq1, seq2, 10))
+    assert [(window.start, window.end) for window in windows] == [(0, 10), (10, 20), (20, 30), (30, 33)]
+    assert sum(window.cost for window in windows) == total
+    assert windows[-1].seq2_end == len(seq2)
+    assert [(window.start, window.end) for window in window_profile(seq1, seq2, 11, 7)][-2:] == [(21, 32), (28, 33)]
+
+
+@with_import('local')
+def test_local_alignment_finds_gene(local_align):
+    import random
+
+    genome = read_sequence(test_files / 'bovine_coronavirus.txt')[:3000]
+    gene = genome[2000:2120]
+    gene = gene[:50] + 'ac' + gene[50:100] + gene[104:]
+
+    result = local_align(gene, genome)
+    assert (result.start1, result.end1, result.start2, result.end2) == (0, len(gene), 2000, 2120)
+    assert result.alignment1.replace('-', '') == gene
+    assert result.alignment2.replace('-', '') == genome[2000:2120]
+    assert local_align(gene, genome, banded_width=3, traceback=False) == result[:5] + (None, None)
+
+    assert local_align('TTTTTGATTACAGGGG', 'CCGATTTACACC') == (-16, 5, 12, 2, 10, 'GA-TTACA', 'GATTTACA')
+    assert local_align('AAAA', 'CCCC') == (0, 0, 0, 0, 0, '', '')
+
+    # With a narrow band the cost must still be what the returned strings cost
+    def rescore(alignment1, alignment2):
+        return sum(5 if '-' in pair else -3 if pair[0] == pair[1] else 1 for pair in zip(alignment1, alignment2))
+
+    random.seed(7)
+    for _ in range(100):
+        seq1 = ''.join(random.choice('ACGT') for _ in range(random.randrange(1, 40)))
+        seq2 = ''.join(random.choice('ACGT') for _ in range(random.randrange(1, 40)))
+        for banded_width in (-1, 1):
+            result = local_align(seq1, seq2, banded_width=banded_width)
+            assert rescore(result.alignment1, result.alignment2) == result.cost
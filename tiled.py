@@ -0,0 +1,215 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from alignment import DIAG, LEFT, _edit_row, _edit_row_moves, _profiles, _typecode
+
+# Rows and columns per tile; big enough that a tile's fill dwarfs the cost of shipping it to a worker
+TILE_SIZE = 512
+
+
+def tiled_path(penalties: dict, gap: str, x: str, y: str, workers: int | None = None, tile: int = TILE_SIZE) -> tuple[int, str, str]:
+    """
+    Same result as find_path(penalties, gap, edit(penalties, x, y), x, y), with the fill spread over worker processes.
+    The matrix is cut into tile x tile blocks; every block on one anti-diagonal of blocks only needs the
+    bottom row of the block above it and the right column of the block to its left, so those run in parallel.
+    Only the block boundaries are kept, in shared memory. The traceback refills just the blocks the path
+    crosses, from their stored boundaries, which gives exactly the moves the full matrix would have.
+    """
+    with _Boundaries(penalties, x, y, tile) as boundaries:
+        boundaries.fill(workers)
+        return boundaries.traceback(gap)
+
+
+def tiled_score(penalties: dict, x: str, y: str, workers: int | None = None, tile: int = TILE_SIZE):
+    """
+    Same cost as edit_score(), from the parallel fill alone
+    """
+    with _Boundaries(penalties, x, y, tile) as boundaries:
+        boundaries.fill(workers)
+        return boundaries.horizontal[len(boundaries.row_bounds) - 1][len(y)]
+
+
+class _Boundaries:
+    """
+    The rows and columns of the DP matrix that lie on tile edges, in two shared memory blocks:
+    horizontal[r] is matrix row row_bounds[r] and vertical[c] is matrix column col_bounds[c].
+    """
+
+    def __init__(self, penalties: dict, x: str, y: str, tile: int):
+        self.penalties = penalties
+        self.x = x
+        self.y = y
+        self.tile = tile
+        self.typecode = _typecode(penalties)
+        self.row_bounds = list(range(0, len(x), tile)) + [len(x)]
+        self.col_bounds = list(range(0, len(y), tile)) + [len(y)]
+
+        itemsize = array(self.typecode).itemsize
+        self._shared = [
+            SharedMemory(create=True, size=max(1, len(self.row_bounds) * (len(y) + 1) * itemsize)),
+            SharedMemory(create=True, size=max(1, len(self.col_bounds) * (len(x) + 1) * itemsize))
+        ]
+        self.horizontal = _rows(self._shared[0], self.typecode, len(self.row_bounds), len(y) + 1)
+        self.vertical = _rows(self._shared[1], self.typecode, len(self.col_bounds), len(x) + 1)
+
+        indel = penalties["indel"]
+        for j in range(len(y) + 1):
+            self.horizontal[0][j] = j * indel
+        for i in range(len(x) + 1):
+            self.vertical[0][i] = i * indel
+        for r, i in enumerate(self.row_bounds):
+            self.horizontal[r][0] = i * indel
+        for c, j in enumerate(self.col_bounds):
+            self.vertical[c][0] = j * indel
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Views into the blocks have to go before the blocks can be closed
+        del self.horizontal, self.vertical
+        for shared in self._shared:
+            shared.close()
+            shared.unlink()
+
+    def fill(self, workers: int | None):
+        tiles_down = len(self.row_bounds) - 1
+        tiles_across = len(self.col_bounds) - 1
+        if tiles_down == 0 or tiles_across == 0:
+            return
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for wave in range(tiles_down + tiles_across - 1):
+                jobs = [
+                    pool.submit(_fill_tile, self._job(r, wave - r))
+                    for r in range(max(0, wave - tiles_across + 1), min(wave, tiles_down - 1) + 1)
+                ]
+                for job in jobs:
+                    job.result()
+
+    def traceback(self, gap: str) -> tuple[int, str, str]:
+        backwards1 = []
+        backwards2 = []
+        i = len(self.x)
+        j = len(self.y)
+
+        while i > 0 and j > 0:
+            r = (i - 1) // self.tile
+            c = (j - 1) // self.tile
+            top = self.row_bounds[r]
+            left = self.col_bounds[c]
+            moves = _tile_moves(self._job(r, c))
+
+            # Walk the tile's recorded moves until the path leaves it
+            while i > top and j > left:
+                move = moves[i - top - 1][j - left]
+                if move == DIAG:
+                    backwards1.append(self.x[i - 1])
+                    backwards2.append(self.y[j - 1])
+                    i -= 1
+                    j -= 1
+                elif move == LEFT:
+                    backwards1.append(gap)
+                    backwards2.append(self.y[j - 1])
+                    j -= 1
+                else:
+                    backwards1.append(self.x[i - 1])
+                    backwards2.append(gap)
+                    i -= 1
+
+        while i > 0:
+            backwards1.append(self.x[i - 1])
+            backwards2.append(gap)
+            i -= 1
+        while j > 0:
+            backwards1.append(gap)
+            backwards2.append(self.y[j - 1])
+            j -= 1
+
+        cost = self.horizontal[len(self.row_bounds) - 1][len(self.y)]
+        return cost, ''.join(reversed(backwards1)), ''.join(reversed(backwards2))
+
+    def _job(self, r: int, c: int) -> tuple:
+        top, bottom = self.row_bounds[r], self.row_bounds[r + 1]
+        left, right = self.col_bounds[c], self.col_bounds[c + 1]
+        return (
+            self.penalties, self.typecode,
+            self._shared[0].name, self._shared[1].name,
+            len(self.row_bounds), len(self.col_bounds), len(self.x), len(self.y),
+            r, c, top, bottom, left, right,
+            self.x[top:bottom], self.y[left:right]
+        )
+
+
+def _rows(shared: SharedMemory, typecode: str, count: int, length: int) -> list[memoryview]:
+    view = shared.buf.cast(typecode)
+    return [view[k * length:(k + 1) * length] for k in range(count)]
+
+
+def _fill_tile(job: tuple):
+    """
+    Worker side: fill one tile from its top and left boundaries and publish its bottom row and right column
+    """
+    penalties, typecode, horizontal_name, vertical_name, row_count, col_count, n, m, \
+        r, c, top, bottom, left, right, x, y = job
+
+    horizontal_shared = SharedMemory(name=horizontal_name)
+    vertical_shared = SharedMemory(name=vertical_name)
+    try:
+        horizontal = _rows(horizontal_shared, typecode, row_count, m + 1)
+        vertical = _rows(vertical_shared, typecode, col_count, n + 1)
+
+        indel = penalties["indel"]
+        x_codes, profiles = _profiles(penalties, x, y)
+        prev = array(typecode, horizontal[r][left:right + 1])
+        row = array(typecode, prev)
+        right_column = vertical[c + 1]
+
+        for i in range(1, bottom - top + 1):
+            row[0] = vertical[c][top + i]
+            _edit_row(prev, row, profiles[x_codes[i - 1]], indel)
+            right_column[top + i] = row[-1]
+            prev, row = row, prev
+
+        horizontal[r + 1][left + 1:right + 1] = prev[1:]
+
+        del horizontal, vertical, right_column
+    finally:
+        horizontal_shared.close()
+        vertical_shared.close()
+
+
+def _tile_moves(job: tuple) -> list[bytearray]:
+    """
+    Refill one tile from its stored boundaries, keeping every row's moves: moves[i - top - 1][j - left]
+    """
+    penalties, typecode, horizontal_name, vertical_name, row_count, col_count, n, m, \
+        r, c, top, bottom, left, right, x, y = job
+
+    horizontal_shared = SharedMemory(name=horizontal_name)
+    vertical_shared = SharedMemory(name=vertical_name)
+    try:
+        horizontal = _rows(horizontal_shared, typecode, row_count, m + 1)
+        vertical = _rows(vertical_shared, typecode, col_count, n + 1)
+
+        indel = penalties["indel"]
+        x_codes, profiles = _profiles(penalties, x, y)
+        prev = array(typecode, horizontal[r][left:right + 1])
+        row = array(typecode, prev)
+        moves = []
+
+        for i in range(1, bottom - top + 1):
+            row[0] = vertical[c][top + i]
+            codes = bytearray(right - left + 1)
+            _edit_row_moves(prev, row, codes, profiles[x_codes[i - 1]], indel)
+            moves.append(codes)
+            prev, row = row, prev
+
+        del horizontal, vertical
+    finally:
+        horizontal_shared.close()
+        vertical_shared.close()
+
+    return moves
@@ -0,0 +1,133 @@
+import numpy as np
+
+from alignment import DIAG, LEFT, UP, _cost_table, _swapped, _typecode
+
+
+def wavefront_path(penalties: dict, gap: str, x: str, y: str) -> tuple[int, str, str]:
+    """
+    Same result as find_path(penalties, gap, edit(penalties, x, y), x, y), but fills one anti-diagonal
+    at a time with NumPy. Cells with i + j == d only depend on diagonals d - 1 and d - 2,
+    so each diagonal is a handful of vectorized adds and mins.
+    Scores are kept for three diagonals only; the winning move of every cell is kept in one uint8 byte,
+    the diagonals packed back to back from their first cell (see _diagonal_starts()), which is all
+    the traceback reads.
+    """
+    n = len(x)
+    m = len(y)
+    starts = _diagonal_starts(n, m)
+    moves = np.empty(starts[-1], dtype=np.uint8)
+    cost = _fill(penalties, x, y, moves)
+    starts = starts.tolist()
+
+    backwards1 = []
+    backwards2 = []
+
+    i = n
+    j = m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            move = moves.item(starts[i + j] + i - max(0, i + j - m))
+        else:
+            move = UP if i > 0 else LEFT
+
+        if move == DIAG:
+            backwards1.append(x[i - 1])
+            backwards2.append(y[j - 1])
+            i -= 1
+            j -= 1
+        elif move == LEFT:
+            backwards1.append(gap)
+            backwards2.append(y[j - 1])
+            j -= 1
+        else:
+            backwards1.append(x[i - 1])
+            backwards2.append(gap)
+            i -= 1
+
+    return cost, ''.join(reversed(backwards1)), ''.join(reversed(backwards2))
+
+
+def wavefront_score(penalties: dict, x: str, y: str):
+    """
+    Same cost as edit_score(): the anti-diagonal fill without recording any moves
+    """
+    if len(y) < len(x):
+        x, y = y, x
+        penalties = _swapped(penalties)
+    return _fill(penalties, x, y, None)
+
+
+def encode(table, seq: str) -> np.ndarray:
+    """
+    The cost table's codes for seq as a uint8 array
+    """
+    return np.frombuffer(table.encode(seq), dtype=np.uint8)
+
+
+def _diagonal_starts(n: int, m: int) -> np.ndarray:
+    """
+    Where each anti-diagonal d = i + j begins in the packed moves: its cells max(0, d - m) <= i <= min(n, d)
+    are at starts[d] + i - max(0, d - m), and starts[-1] is (n + 1) * (m + 1), the size of the whole
+    """
+    d = np.arange(n + m + 1)
+    widths = np.minimum(n, d) - np.maximum(0, d - m) + 1
+    return np.concatenate(([0], np.cumsum(widths)))
+
+
+def _fill(penalties: dict, x: str, y: str, moves: np.ndarray | None):
+    """
+    The anti-diagonal fill, recording each cell's move into moves (laid out by _diagonal_starts()) if given
+    :return: the cost
+    """
+    n = len(x)
+    m = len(y)
+    starts = _diagonal_starts(n, m).tolist() if moves is not None else None
+
+    indel = penalties["indel"]
+    dtype = np.int64 if _typecode(penalties) == 'i' else np.float64
+
+    table = _cost_table(penalties, x, y)
+    costs = np.array(table.costs, dtype=dtype)
+    xs = encode(table, x)
+    # Reversed so that y[j - 1] for the cells of one diagonal is a forward slice
+    ys = encode(table, y)[::-1]
+
+    # Scores of diagonals d - 2, d - 1 and d, indexed by i
+    before = np.zeros(n + 1, dtype=dtype)
+    last = np.zeros(n + 1, dtype=dtype)
+    current = np.zeros(n + 1, dtype=dtype)
+
+    for d in range(n + m + 1):
+        lo = max(0, d - m)
+        hi = min(n, d)
+        if moves is not None:
+            # This diagonal's moves, indexed by i - lo
+            diagonal = moves[starts[d]:starts[d + 1]]
+
+        if lo == 0:
+            current[0] = d * indel
+            if moves is not None:
+                diagonal[0] = LEFT
+        if hi == d:
+            current[d] = d * indel
+            if moves is not None:
+                diagonal[d - lo] = UP
+
+        # Interior cells: 1 <= i <= n and 1 <= j = d - i <= m
+        a = max(lo, 1)
+        b = min(hi, d - 1)
+        if a <= b:
+            diag = before[a - 1:b] + costs[xs[a - 1:b], ys[m - d + a:m - d + b + 1]]
+            left = last[a:b + 1] + indel
+            up = last[a - 1:b] + indel
+
+            best = np.minimum(diag, left)
+            if moves is not None:
+                move = diagonal[a - lo:b - lo + 1]
+                np.less(left, diag, out=move, casting='unsafe')
+                move[up < best] = UP
+            np.minimum(best, up, out=current[a:b + 1])
+
+        before, last, current = last, current, before
+
+    return last[n].item()
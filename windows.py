@@ -0,0 +1,99 @@
+from array import array
+from typing import Iterator, NamedTuple
+
+from alignment import DIAG, LEFT, _cost_table, _typecode, diagonal_band_edit, find_alignment
+
+# Diagonals of padding around the band between the two sequences' ends that window_profile() aligns in
+PROFILE_BAND = 100
+
+
+class Window(NamedTuple):
+    """
+    One window of a profile: seq1[start:end], the stretch seq2[seq2_start:seq2_end] it aligns to,
+    and the cost of the alignment columns between them
+    """
+    start: int
+    end: int
+    seq2_start: int
+    seq2_end: int
+    cost: float
+
+
+def window_profile(
+        seq1: str,
+        seq2: str,
+        window: int,
+        stride: int | None = None,
+        match_award=-3,
+        indel_penalty=5,
+        sub_penalty=1,
+        costs=None,
+        band: int = PROFILE_BAND
+) -> Iterator[Window]:
+    """
+    Alignment cost along seq1 in windows of `window` characters every `stride` (default: window, no overlap).
+    The two sequences are aligned once, banded, and each window's cost is read off that one alignment with
+    prefix sums, so overlapping windows share all the DP work and a whole-genome profile takes
+    O(len(seq1) * band) however small the stride. Gaps in seq1 count towards the window of the character
+    they come before, and gaps after the end of seq1 to the last window. The last window always ends
+    at the end of seq1, so it is shorter than window when seq1 does not end on a stride.
+    :param band: diagonals of padding beyond the length difference; divergent pairs may need more
+    """
+    if window <= 0 or (stride is not None and stride <= 0):
+        raise ValueError('window and stride must be positive')
+    stride = stride or window
+
+    penalties = {
+        'match': match_award,
+        'indel': indel_penalty,
+        'sub': sub_penalty,
+        'costs': costs
+    }
+    n = len(seq1)
+    m = len(seq2)
+    if n == 0:
+        yield Window(0, 0, 0, m, indel_penalty * m)
+        return
+
+    lo = max(min(0, m - n) - band, -n)
+    hi = min(max(0, m - n) + band, m)
+    alignment = find_alignment(penalties, '-', diagonal_band_edit(penalties, seq1, seq2, lo, hi), seq1, seq2)
+
+    # before[i] and seq2_at[i]: the cost and the seq2 position once the alignment has used seq1[:i]
+    # (64-bit, as a genome's running total can outgrow the matrix's C ints)
+    before = array('q' if _typecode(penalties) == 'i' else 'd', bytes(8 * (n + 1)))
+    seq2_at = array('q', bytes(8 * (n + 1)))
+    table = _cost_table(penalties, seq1, seq2)
+    x_codes = table.encode(seq1)
+    y_codes = table.encode(seq2)
+    indel = penalties['indel']
+    total = 0
+    i = j = 0
+    for run in alignment.runs:
+        length = run >> 2
+        move = run & 3
+        if move == LEFT:
+            total += indel * length
+            j += length
+            continue
+        for _ in range(length):
+            if move == DIAG:
+                total += table.costs[x_codes[i]][y_codes[j]]
+                j += 1
+            else:
+                total += indel
+            i += 1
+            before[i] = total
+            seq2_at[i] = j
+    # Gaps after the last character of seq1 belong to the last window
+    before[n] = total
+    seq2_at[n] = j
+
+    start = 0
+    while True:
+        end = min(start + window, n)
+        yield Window(start, end, seq2_at[start], seq2_at[end], before[end] - before[start])
+        if end == n:
+            break
+        # The last window is cut short at the end of seq1 rather than dropped
+        start = min(start + stride, n - 1)